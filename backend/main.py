@@ -51,6 +51,7 @@ async def test_download():
         # Test with a dummy filename
         test_filename = "test-download.mp4"
         result = await storage_service.download_video(test_filename)
+        video_processor.cleanup_temp_file(result)
         return {"status": "success", "message": f"Download test completed: {result}"}
     except Exception as e:
         return {"status": "error", "message": str(e), "error_type": type(e).__name__}
@@ -234,10 +235,12 @@ async def upload_video(file: UploadFile = File(...)):
             print(f"Invalid file type: {file.content_type}")
             raise HTTPException(status_code=400, detail="Unsupported file type")
         
-        # Validate file size (50MB limit)
+        # Validate file size (50MB limit) without reading the body into memory
         max_size = 50 * 1024 * 1024  # 50MB in bytes
-        file_content = await file.read()
-        file_size = len(file_content)
+        file_size = file.size
+        if file_size is None:
+            file.file.seek(0, os.SEEK_END)
+            file_size = file.file.tell()
         print(f"File size: {file_size} bytes ({file_size / (1024*1024):.2f} MB)")
         
         if file_size > max_size:
@@ -274,7 +277,7 @@ async def upload_video(file: UploadFile = File(...)):
         print(f"Upload error: {str(e)}")
         print(f"File: {file.filename if file else 'Unknown'}")
         print(f"Content-Type: {file.content_type if file else 'Unknown'}")
-        print(f"File size: {len(file_content) if 'file_content' in locals() else 'Unknown'}")
+        print(f"File size: {file_size if 'file_size' in locals() else 'Unknown'}")
         
         # Check for specific error types
         if "R2_ENDPOINT_URL" in str(e) or "R2_ACCESS_KEY_ID" in str(e):
@@ -357,39 +360,43 @@ async def _perform_analysis(request: AnalysisRequest) -> AnalysisResponse:
         logger.error(f"❌ Video download failed: {str(e)}")
         raise
     
-    # Step 2: Process video for analysis (validate and optimize)
-    logger.info("Step 2: Processing video for analysis...")
-    optimized_video_path = None
+    # Downloaded video lives in RAM-backed storage, so remove it however Steps 2-3 end
     try:
-        optimized_video_path = await video_processor.process_video_for_analysis(video_path)
-        logger.info(f"✅ Video processed successfully: {optimized_video_path}")
-        
-        # Log optimized file size
-        optimized_size = os.path.getsize(optimized_video_path)
-        logger.info(f"  Optimized file size: {optimized_size} bytes ({optimized_size / (1024*1024):.2f} MB)")
-        
-    except Exception as e:
-        logger.error(f"❌ Video processing failed: {str(e)}")
-        raise
-    
-    # Step 3: Analyze with Gemini (sends optimized video!)
-    logger.info("Step 3: Analyzing with Gemini Vision...")
-    try:
-        analysis_result = await llm_analyzer.analyze_exercise(optimized_video_path, request.exercise_type)
-        logger.info("✅ Analysis completed!")
-        
-        # Log analysis results summary
-        if "feedback" in analysis_result and "overall_score" in analysis_result["feedback"]:
-            score = analysis_result["feedback"]["overall_score"]
-            logger.info(f"  Overall score: {score}/100")
+        # Step 2: Process video for analysis (validate and optimize)
+        logger.info("Step 2: Processing video for analysis...")
+        optimized_video_path = None
+        try:
+            optimized_video_path = await video_processor.process_video_for_analysis(video_path)
+            logger.info(f"✅ Video processed successfully: {optimized_video_path}")
+            
+            # Log optimized file size
+            optimized_size = os.path.getsize(optimized_video_path)
+            logger.info(f"  Optimized file size: {optimized_size} bytes ({optimized_size / (1024*1024):.2f} MB)")
+            
+        except Exception as e:
+            logger.error(f"❌ Video processing failed: {str(e)}")
+            raise
         
-    except Exception as e:
-        logger.error(f"❌ Gemini analysis failed: {str(e)}")
-        raise
+        # Step 3: Analyze with Gemini (sends optimized video!)
+        logger.info("Step 3: Analyzing with Gemini Vision...")
+        try:
+            analysis_result = await llm_analyzer.analyze_exercise(optimized_video_path, request.exercise_type)
+            logger.info("✅ Analysis completed!")
+            
+            # Log analysis results summary
+            if "feedback" in analysis_result and "overall_score" in analysis_result["feedback"]:
+                score = analysis_result["feedback"]["overall_score"]
+                logger.info(f"  Overall score: {score}/100")
+            
+        except Exception as e:
+            logger.error(f"❌ Gemini analysis failed: {str(e)}")
+            raise
+        finally:
+            # Clean up optimized video file
+            if optimized_video_path and os.path.exists(optimized_video_path):
+                video_processor.cleanup_temp_file(optimized_video_path)
     finally:
-        # Clean up optimized video file
-        if optimized_video_path and os.path.exists(optimized_video_path):
-            video_processor.cleanup_temp_file(optimized_video_path)
+        video_processor.cleanup_temp_file(video_path)
     
     # Step 4: Create response
     analysis_response = AnalysisResponse(
@@ -1,19 +1,88 @@
 import cv2
+import copy
+import asyncio
+import hashlib
+from collections import OrderedDict
 import numpy as np
 from typing import List, Dict, Any
 from utils.angle_calculator import AngleCalculator
 from utils.screenshot_annotator import ScreenshotAnnotator
 from utils.rep_detector import RepDetector
+from utils import pose_kernels
+from utils.pose_kernels import HAS_NUMBA, deadlift_frame_metrics
+
+# Issue tallies are kept as an int matrix indexed by (type, severity)
+ISSUE_TYPES = ("shoulder_position", "hip_position", "back_rounding", "hip_angle", "knee_angle", "bar_path")
+SEVERITIES = ("high", "medium")
+SHOULDER_POSITION, HIP_POSITION, BACK_ROUNDING, HIP_ANGLE, KNEE_ANGLE, BAR_PATH = range(len(ISSUE_TYPES))
+HIGH, MEDIUM = range(len(SEVERITIES))
+
+# Exercise breakdown sections: (key, issue types, penalty per issue, feedback)
+BREAKDOWN = (
+    ("setup", [SHOULDER_POSITION, HIP_POSITION], 25,
+     "Focus on proper setup: shoulders over bar, hips higher than knees."),
+    ("back_position", [BACK_ROUNDING], 30,
+     "Maintain neutral spine throughout. Think 'chest up' and 'core braced'."),
+    ("hip_hinge", [HIP_ANGLE, KNEE_ANGLE], 20,
+     "This is a hip hinge movement, not a squat. Push hips back and keep knees relatively straight."),
+    ("bar_path", [BAR_PATH], 15,
+     "Keep the bar close to your body throughout the entire lift."),
+)
+
+RESULT_CACHE_SIZE = 32  # Analyses kept for repeat submissions of the same pose data
+
+# Feedback for a video with no detected issues
+PERFECT_FEEDBACK = {
+    "overall_score": 100,
+    "strengths": ["Excellent deadlift form!"],
+    "areas_for_improvement": [],
+    "specific_cues": [],
+    "exercise_breakdown": {
+        "setup": {"score": 0, "feedback": ""},
+        "back_position": {"score": 0, "feedback": ""},
+        "hip_hinge": {"score": 0, "feedback": ""},
+        "bar_path": {"score": 0, "feedback": ""}
+    }
+}
+
+class MetricsSummary:
+    """Running sums of per-frame metrics, accumulated once during analysis"""
+    
+    def __init__(self):
+        self.frames = 0
+        self.back_angle = 0.0
+        self.hip_angle = 0.0
+        self.knee_angle = 0.0
+        self.bar_path_deviation = 0.0
+    
+    def add_arrays(self, back_angle: np.ndarray, hip_angle: np.ndarray, knee_angle: np.ndarray, bar_path_deviation: np.ndarray):
+        """Fold a batch of per-frame metric arrays into the running sums"""
+        self.frames += len(back_angle)
+        self.back_angle += float(back_angle.sum())
+        self.hip_angle += float(hip_angle.sum())
+        self.knee_angle += float(knee_angle.sum())
+        self.bar_path_deviation += float(bar_path_deviation.sum())
+    
+    def mean(self, total: float) -> float:
+        """Average a running sum over the frames seen so far"""
+        return total / self.frames if self.frames else 0.0
 
 class DeadliftAnalyzer:
     def __init__(self):
         self.angle_calc = AngleCalculator()
         self.annotator = ScreenshotAnnotator()
         self.rep_detector = RepDetector()
+        self._result_cache = OrderedDict()
+        
+        if HAS_NUMBA:
+            # Warm up the JIT so the first request doesn't pay compilation latency
+            deadlift_frame_metrics(np.zeros((1, AngleCalculator.NUM_LANDMARKS, 3), dtype=np.float32), np.zeros(1, dtype=np.int64))
     
     async def analyze(self, pose_data: List[Dict], frames: List[str]) -> Dict[str, Any]:
         """Analyze deadlift form and return feedback"""
-        if not pose_data:
+        landmarks = self.angle_calc.to_array(pose_data)
+        
+        if not len(landmarks):
             print("WARNING: No pose data detected - MediaPipe may have failed")
             return {
                 "feedback": {
@@ -27,164 +96,127 @@ class DeadliftAnalyzer:
                 "metrics": {"error": "no_pose_detected"}
             }
         
-        # Detect individual reps
-        rep_boundaries = self.rep_detector.detect_reps(pose_data, "deadlift")
-        rep_data = self.rep_detector.get_rep_data(pose_data, rep_boundaries)
+        # Retries of the same video produce identical landmarks, so reuse the result
+        cache_key = hashlib.blake2b(landmarks.tobytes(), digest_size=16).digest()
+        if cache_key in self._result_cache:
+            self._result_cache.move_to_end(cache_key)
+            return copy.deepcopy(self._result_cache[cache_key])
         
-        if not rep_data:
-            # Fallback: treat entire video as one rep
-            rep_data = [{
-                'start_frame': 0,
-                'end_frame': len(pose_data) - 1,
-                'frames': pose_data,
-                'duration': len(pose_data)
-            }]
-        
-        # Analyze each rep
-        rep_scores = []
-        all_issues = []
-        rep_analysis = []
-        
-        for rep_idx, rep in enumerate(rep_data):
-            rep_issues = []
-            rep_metrics = []
-            
-            for frame_idx, frame_data in enumerate(rep['frames']):
-                landmarks = frame_data["landmarks"]
-                
-                # Calculate key metrics with fallback for failed angle calculations
-                try:
-                    back_angle = self.angle_calc.get_back_angle(landmarks)
-                    left_hip_angle = self.angle_calc.get_hip_angle(landmarks, "left")
-                    right_hip_angle = self.angle_calc.get_hip_angle(landmarks, "right")
-                    left_knee_angle = self.angle_calc.get_knee_angle(landmarks, "left")
-                    right_knee_angle = self.angle_calc.get_knee_angle(landmarks, "right")
-                except:
-                    # Fallback values when angle calculation fails
-                    back_angle = 20  # Slightly forward lean
-                    left_hip_angle = 45
-                    right_hip_angle = 45
-                    left_knee_angle = 95
-                    right_knee_angle = 95
-            
-            # Calculate setup position (first frame analysis)
-            setup_issues = []
-            if i == 0:  # Analyze setup position
-                shoulder_pos = self._get_shoulder_position(landmarks)
-                hip_pos = self._get_hip_position(landmarks)
-                bar_position = self._estimate_bar_position(landmarks)
-                
-                # Check if shoulders are over bar
-                if shoulder_pos[0] < bar_position[0] - 0.1:  # Shoulders behind bar
-                    setup_issues.append({
-                        "type": "shoulder_position",
-                        "severity": "high",
-                        "message": "Shoulders should be directly over the bar at setup"
-                    })
-                
-                # Check hip position relative to knees
-                if hip_pos[1] < self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.LEFT_KNEE)[1] - 0.05:
-                    setup_issues.append({
-                        "type": "hip_position",
-                        "severity": "medium",
-                        "message": "Hips should be higher than knees at setup"
-                    })
-            
-            # Analyze movement issues
-            frame_issues = []
-            
-            # Back rounding
-            if back_angle > 30:  # Excessive back rounding
-                frame_issues.append({
-                    "type": "back_rounding",
-                    "severity": "high",
-                    "message": "Back is rounding - maintain neutral spine throughout the lift"
-                })
-            
-            # Hip angle too shallow (squatting the deadlift)
-            avg_hip_angle = (left_hip_angle + right_hip_angle) / 2
-            if avg_hip_angle > 120:  # Too upright, squatting motion
-                frame_issues.append({
-                    "type": "hip_angle",
-                    "severity": "medium",
-                    "message": "Hips too high - this is a hip hinge, not a squat"
-                })
-            
-            # Knee angle too deep (squatting)
-            avg_knee_angle = (left_knee_angle + right_knee_angle) / 2
-            if avg_knee_angle < 90:  # Too deep, squatting motion
-                frame_issues.append({
-                    "type": "knee_angle",
-                    "severity": "medium",
-                    "message": "Knees too bent - focus on hip hinge movement"
-                })
-            
-            # Bar path analysis (simplified)
-            bar_path_deviation = self._analyze_bar_path(landmarks, i)
-            if bar_path_deviation > 0.1:  # Bar drifting away from body
-                frame_issues.append({
-                    "type": "bar_path",
-                    "severity": "medium",
-                    "message": "Bar drifting away from body - keep it close throughout the lift"
-                })
-            
-            analysis_results.append({
-                "frame_index": i,
-                "back_angle": back_angle,
-                "hip_angle": avg_hip_angle,
-                "knee_angle": avg_knee_angle,
-                "bar_path_deviation": bar_path_deviation,
-                "issues": frame_issues + setup_issues
-            })
-            
-            issues_found.extend(frame_issues + setup_issues)
+        frame_indices = self._get_rep_frame_indices(landmarks)
+        summary = MetricsSummary()
+        issue_counts = await asyncio.to_thread(self._analyze_frames, landmarks, frame_indices, summary)
         
         # Generate overall feedback
-        feedback = self._generate_feedback(issues_found, analysis_results)
+        feedback = self._generate_feedback(issue_counts, summary)
         
         # Skip screenshot generation for now
         print("Skipping screenshot generation - visual analysis disabled")
         screenshots = []
         
         # Calculate overall metrics
-        metrics = self._calculate_metrics(analysis_results)
+        metrics = self._calculate_metrics(summary)
         
-        return {
+        result = {
             "feedback": feedback,
             "screenshots": screenshots,
             "metrics": metrics
         }
+        self._result_cache[cache_key] = copy.deepcopy(result)
+        if len(self._result_cache) > RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+        return result
+    
+    def _get_rep_frame_indices(self, landmarks: np.ndarray) -> np.ndarray:
+        """Indices of every frame covered by a detected rep"""
+        rep_boundaries = self.rep_detector.detect_reps(landmarks, "deadlift")
+        
+        if not len(rep_boundaries):
+            # Fallback: treat entire video as one rep
+            return np.arange(len(landmarks))
+        
+        return np.concatenate([np.arange(start, end + 1) for start, end in rep_boundaries])
+    
+    def _analyze_frames(self, landmarks: np.ndarray, frame_indices: np.ndarray, summary: "MetricsSummary") -> np.ndarray:
+        """Tally form issues over the selected frames in one vectorized pass"""
+        issue_counts = np.zeros((len(ISSUE_TYPES), len(SEVERITIES)), dtype=np.int32)
+        
+        # Analyze setup position on the first frame of the video
+        if frame_indices[0] == 0:
+            self._analyze_setup(landmarks[0], issue_counts)
+        
+        if HAS_NUMBA:
+            back_angle, hip_angle, knee_angle, bar_path_deviation, counts = deadlift_frame_metrics(landmarks, frame_indices)
+            issue_counts[BACK_ROUNDING, HIGH] += counts[0]
+            issue_counts[HIP_ANGLE, MEDIUM] += counts[1]
+            issue_counts[KNEE_ANGLE, MEDIUM] += counts[2]
+            issue_counts[BAR_PATH, MEDIUM] += counts[3]
+            summary.add_arrays(back_angle, hip_angle, knee_angle, bar_path_deviation)
+            return issue_counts
+        
+        metrics = self.angle_calc.batch(landmarks[frame_indices])
+        
+        # Fallback values where angle calculation failed (missing or degenerate landmarks)
+        back_angle = np.where(np.isnan(metrics["back_angle"]), pose_kernels.FALLBACK_BACK_ANGLE, metrics["back_angle"])
+        hip_angle = (
+            np.where(np.isnan(metrics["left_hip_angle"]), pose_kernels.FALLBACK_HIP_ANGLE, metrics["left_hip_angle"])
+            + np.where(np.isnan(metrics["right_hip_angle"]), pose_kernels.FALLBACK_HIP_ANGLE, metrics["right_hip_angle"])
+        ) / 2
+        knee_angle = (
+            np.where(np.isnan(metrics["left_knee_angle"]), pose_kernels.FALLBACK_KNEE_ANGLE, metrics["left_knee_angle"])
+            + np.where(np.isnan(metrics["right_knee_angle"]), pose_kernels.FALLBACK_KNEE_ANGLE, metrics["right_knee_angle"])
+        ) / 2
+        bar_path_deviation = self._analyze_bar_path(back_angle)
+        
+        # Back is rounding - maintain neutral spine throughout the lift
+        issue_counts[BACK_ROUNDING, HIGH] += np.count_nonzero(back_angle > pose_kernels.BACK_ROUNDING_ANGLE)
+        # Hips too high - this is a hip hinge, not a squat
+        issue_counts[HIP_ANGLE, MEDIUM] += np.count_nonzero(hip_angle > pose_kernels.HIGH_HIP_ANGLE)
+        # Knees too bent - focus on hip hinge movement
+        issue_counts[KNEE_ANGLE, MEDIUM] += np.count_nonzero(knee_angle < pose_kernels.KNEE_BEND_ANGLE)
+        # Bar drifting away from body - keep it close throughout the lift
+        issue_counts[BAR_PATH, MEDIUM] += np.count_nonzero(bar_path_deviation > pose_kernels.BAR_DRIFT)
+        
+        summary.add_arrays(back_angle, hip_angle, knee_angle, bar_path_deviation)
+        return issue_counts
+    
+    def _analyze_setup(self, landmarks: np.ndarray, issue_counts: np.ndarray):
+        """Tally setup position issues from one frame's landmark row"""
+        shoulder_pos = self._get_shoulder_position(landmarks)
+        hip_pos = self._get_hip_position(landmarks)
+        bar_position = self._estimate_bar_position(landmarks)
+        
+        # Shoulders should be directly over the bar at setup
+        if shoulder_pos[0] < bar_position[0] - 0.1:  # Shoulders behind bar
+            issue_counts[SHOULDER_POSITION, HIGH] += 1
+        
+        # Hips should be higher than knees at setup
+        if hip_pos[1] < landmarks[AngleCalculator.LEFT_KNEE, 1] - 0.05:
+            issue_counts[HIP_POSITION, MEDIUM] += 1
     
-    def _get_shoulder_position(self, landmarks: List[Dict]) -> tuple:
+    def _get_shoulder_position(self, landmarks: np.ndarray) -> tuple:
         """Get shoulder position"""
-        left_shoulder = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.LEFT_SHOULDER)
-        right_shoulder = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.RIGHT_SHOULDER)
-        return ((left_shoulder[0] + right_shoulder[0]) / 2, (left_shoulder[1] + right_shoulder[1]) / 2)
+        return tuple(landmarks[[AngleCalculator.LEFT_SHOULDER, AngleCalculator.RIGHT_SHOULDER], :2].mean(axis=0))
     
-    def _get_hip_position(self, landmarks: List[Dict]) -> tuple:
+    def _get_hip_position(self, landmarks: np.ndarray) -> tuple:
         """Get hip position"""
-        left_hip = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.LEFT_HIP)
-        right_hip = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.RIGHT_HIP)
-        return ((left_hip[0] + right_hip[0]) / 2, (left_hip[1] + right_hip[1]) / 2)
+        return tuple(landmarks[[AngleCalculator.LEFT_HIP, AngleCalculator.RIGHT_HIP], :2].mean(axis=0))
     
-    def _estimate_bar_position(self, landmarks: List[Dict]) -> tuple:
+    def _estimate_bar_position(self, landmarks: np.ndarray) -> tuple:
         """Estimate bar position (simplified - in practice, you'd need computer vision)"""
         # Assume bar is at ankle level, centered
-        left_ankle = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.LEFT_ANKLE)
-        right_ankle = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.RIGHT_ANKLE)
-        ankle_center_x = (left_ankle[0] + right_ankle[0]) / 2
-        ankle_center_y = (left_ankle[1] + right_ankle[1]) / 2
-        return (ankle_center_x, ankle_center_y)
+        return tuple(landmarks[[AngleCalculator.LEFT_ANKLE, AngleCalculator.RIGHT_ANKLE], :2].mean(axis=0))
     
-    def _analyze_bar_path(self, landmarks: List[Dict], frame_index: int) -> float:
+    def _analyze_bar_path(self, back_angle: np.ndarray) -> np.ndarray:
         """Analyze bar path deviation (simplified)"""
         # This is a simplified version - in practice, you'd track the bar position
-        # For now, return a random value based on back angle
-        back_angle = self.angle_calc.get_back_angle(landmarks)
-        return abs(back_angle - 15) / 100  # Simulate bar path based on back angle
+        # For now, derive it from the back angle
+        return np.abs(back_angle - pose_kernels.BAR_PATH_BACK_ANGLE) / pose_kernels.BAR_PATH_SCALE  # Simulate bar path based on back angle
     
-    def _generate_feedback(self, issues: List[Dict], analysis_results: List[Dict]) -> Dict[str, Any]:
+    def _generate_feedback(self, issue_counts: np.ndarray, summary: "MetricsSummary") -> Dict[str, Any]:
         """Generate comprehensive feedback"""
+        if not issue_counts.any():
+            return copy.deepcopy(PERFECT_FEEDBACK)
+        
         feedback = {
             "overall_score": 0,
             "strengths": [],
@@ -199,40 +231,20 @@ class DeadliftAnalyzer:
         }
         
         # Count issues by type
-        issue_counts = {}
-        for issue in issues:
-            issue_type = issue["type"]
-            if issue_type not in issue_counts:
-                issue_counts[issue_type] = 0
-            issue_counts[issue_type] += 1
+        type_counts = issue_counts.sum(axis=1)
+        _, _, back_rounding, hip_angle, knee_angle, bar_path = (int(c) for c in type_counts)
         
         # Generate specific feedback
-        if "shoulder_position" in issue_counts or "hip_position" in issue_counts:
-            feedback["exercise_breakdown"]["setup"] = {
-                "score": max(0, 100 - (issue_counts.get("shoulder_position", 0) + issue_counts.get("hip_position", 0)) * 25),
-                "feedback": "Focus on proper setup: shoulders over bar, hips higher than knees."
-            }
-        
-        if "back_rounding" in issue_counts:
-            feedback["exercise_breakdown"]["back_position"] = {
-                "score": max(0, 100 - issue_counts["back_rounding"] * 30),
-                "feedback": "Maintain neutral spine throughout. Think 'chest up' and 'core braced'."
-            }
-        
-        if "hip_angle" in issue_counts or "knee_angle" in issue_counts:
-            feedback["exercise_breakdown"]["hip_hinge"] = {
-                "score": max(0, 100 - (issue_counts.get("hip_angle", 0) + issue_counts.get("knee_angle", 0)) * 20),
-                "feedback": "This is a hip hinge movement, not a squat. Push hips back and keep knees relatively straight."
-            }
-        
-        if "bar_path" in issue_counts:
-            feedback["exercise_breakdown"]["bar_path"] = {
-                "score": max(0, 100 - issue_counts["bar_path"] * 15),
-                "feedback": "Keep the bar close to your body throughout the entire lift."
-            }
+        for key, issue_types, penalty, text in BREAKDOWN:
+            count = int(type_counts[issue_types].sum())
+            if count:
+                feedback["exercise_breakdown"][key] = {
+                    "score": max(0, 100 - count * penalty),
+                    "feedback": text
+                }
         
         # Calculate overall score
-        total_issues = sum(issue_counts.values())
+        total_issues = int(type_counts.sum())
         feedback["overall_score"] = max(0, 100 - total_issues * 8)
         
         # Generate strengths and improvements
@@ -244,11 +256,11 @@ class DeadliftAnalyzer:
             feedback["areas_for_improvement"].append("Focus on the fundamentals - setup and hip hinge pattern")
         
         # Add specific cues
-        if "back_rounding" in issue_counts:
+        if back_rounding:
             feedback["specific_cues"].append("Keep chest up and maintain neutral spine")
-        if "hip_angle" in issue_counts or "knee_angle" in issue_counts:
+        if hip_angle or knee_angle:
             feedback["specific_cues"].append("Think 'push hips back' not 'sit down'")
-        if "bar_path" in issue_counts:
+        if bar_path:
             feedback["specific_cues"].append("Drag the bar up your legs")
         
         return feedback
@@ -286,21 +298,15 @@ class DeadliftAnalyzer:
         print(f"Final screenshot paths: {screenshot_paths}")
         return screenshot_paths
     
-    def _calculate_metrics(self, analysis_results: List[Dict]) -> Dict[str, Any]:
-        """Calculate overall metrics"""
-        if not analysis_results:
+    def _calculate_metrics(self, summary: "MetricsSummary") -> Dict[str, Any]:
+        """Format the running metric summary as overall metrics"""
+        if not summary.frames:
             return {}
         
-        # Calculate averages
-        avg_back_angle = np.mean([r["back_angle"] for r in analysis_results])
-        avg_hip_angle = np.mean([r["hip_angle"] for r in analysis_results])
-        avg_knee_angle = np.mean([r["knee_angle"] for r in analysis_results])
-        avg_bar_path_deviation = np.mean([r["bar_path_deviation"] for r in analysis_results])
-        
         return {
-            "average_back_angle": avg_back_angle,
-            "average_hip_angle": avg_hip_angle,
-            "average_knee_angle": avg_knee_angle,
-            "average_bar_path_deviation": avg_bar_path_deviation,
-            "total_frames_analyzed": len(analysis_results)
+            "average_back_angle": summary.mean(summary.back_angle),
+            "average_hip_angle": summary.mean(summary.hip_angle),
+            "average_knee_angle": summary.mean(summary.knee_angle),
+            "average_bar_path_deviation": summary.mean(summary.bar_path_deviation),
+            "total_frames_analyzed": summary.frames
         }
@@ -1,14 +1,33 @@
 import boto3
 import os
+import errno
+import asyncio
+import tempfile
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from typing import List
-import uuid
+import hashlib
 import logging
 from functools import wraps
-import time
 
 logger = logging.getLogger(__name__)
 
+# Multipart settings for streaming video uploads
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB parts
+TRANSFER_CONFIG = TransferConfig(
+    multipart_chunksize=UPLOAD_CHUNK_SIZE,
+    max_concurrency=4,
+    use_threads=True
+)
+
+# RAM-backed directory for downloaded videos, falling back to the system temp dir
+DOWNLOAD_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# Content types for the screenshot formats ScreenshotAnnotator can write
+SCREENSHOT_CONTENT_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.webp': 'image/webp'}
+
 def retry_on_failure(max_attempts=3, delay=1):
     def decorator(func):
         @wraps(func)
@@ -19,8 +38,9 @@ def retry_on_failure(max_attempts=3, delay=1):
                 except Exception as e:
                     if attempt == max_attempts:
                         raise
-                    logger.warning(f"Attempt {attempt} failed: {e}. Retrying in {delay}s...")
-                    time.sleep(delay * attempt)
+                    wait = delay * attempt
+                    logger.warning("Attempt %d failed: %s. Retrying in %ss...", attempt, e, wait)
+                    await asyncio.sleep(wait)
             return None
         return wrapper
     return decorator
@@ -32,66 +52,84 @@ class StorageService:
             endpoint_url=os.getenv('R2_ENDPOINT_URL'),
             aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
             aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
-            region_name='auto'
+            region_name='auto',
+            config=Config(
+                max_pool_connections=32,  # Reuse connections across concurrent screenshot uploads
+                retries={"max_attempts": 5, "mode": "adaptive"},
+                tcp_keepalive=True
+            )
         )
         self.bucket_name = os.getenv('R2_BUCKET_NAME', 'fix-my-form')
+        self.public_url = os.getenv('R2_PUBLIC_URL', '')
+        self.verify_uploads = os.getenv('VERIFY_UPLOADS', 'false').lower() == 'true'
+        self._bucket_ready = False
+    
+    def _ensure_bucket(self):
+        """Check the bucket exists, creating it if needed, once per service"""
+        try:
+            self.s3_client.head_bucket(Bucket=self.bucket_name)
+            logger.debug("Bucket %s exists", self.bucket_name)
+        except ClientError as e:
+            logger.info("Bucket %s does not exist, creating...", self.bucket_name)
+            if e.response['Error']['Code'] == '404':
+                self.s3_client.create_bucket(Bucket=self.bucket_name)
+                logger.info("Bucket %s created successfully", self.bucket_name)
+            else:
+                raise Exception(f"Error checking bucket: {str(e)}")
+        self._bucket_ready = True
     
     async def upload_video(self, file, filename: str) -> str:
         """Upload video file to R2 and return public URL"""
         try:
-            print(f"Starting upload to R2: {filename}")
-            print(f"Bucket: {self.bucket_name}")
-            print(f"Endpoint: {os.getenv('R2_ENDPOINT_URL')}")
+            logger.info("Starting upload to R2: %s (bucket %s)", filename, self.bucket_name)
             
-            # Create bucket if it doesn't exist
-            try:
-                self.s3_client.head_bucket(Bucket=self.bucket_name)
-                print(f"Bucket {self.bucket_name} exists")
-            except ClientError as e:
-                print(f"Bucket {self.bucket_name} does not exist, creating...")
-                if e.response['Error']['Code'] == '404':
-                    self.s3_client.create_bucket(Bucket=self.bucket_name)
-                    print(f"Bucket {self.bucket_name} created successfully")
-                else:
-                    raise Exception(f"Error checking bucket: {str(e)}")
+            # Create bucket if it doesn't exist (checked once per service)
+            if not self._bucket_ready:
+                await asyncio.to_thread(self._ensure_bucket)
             
-            # Upload file
-            file_content = await file.read()
-            file_size = len(file_content)
-            print(f"Uploading {file_size} bytes to R2...")
+            # Stream file in multipart chunks instead of reading it all into memory
             
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=f"videos/{filename}",
-                Body=file_content,
-                ContentType=file.content_type
+            await asyncio.to_thread(
+                self.s3_client.upload_fileobj,
+                file.file,
+                self.bucket_name,
+                f"videos/{filename}",
+                ExtraArgs={"ContentType": file.content_type},
+                Config=TRANSFER_CONFIG
             )
             
-            print(f"Upload completed successfully")
+            logger.debug("Upload completed successfully")
             
-            # Verify upload by checking if object exists
-            try:
-                self.s3_client.head_object(
-                    Bucket=self.bucket_name,
-                    Key=f"videos/{filename}"
-                )
-                logger.info(f"✅ Verified: File exists in R2 at videos/{filename}")
-            except ClientError as e:
-                logger.error(f"❌ Verification failed: File NOT found in R2 after upload")
-                raise Exception(f"Upload verification failed: {str(e)}")
+            # Verify upload by checking if object exists (upload already raises on failure)
+            if self.verify_uploads:
+                try:
+                    await asyncio.to_thread(
+                        self.s3_client.head_object,
+                        Bucket=self.bucket_name,
+                        Key=f"videos/{filename}"
+                    )
+                    logger.info("✅ Verified: File exists in R2 at videos/%s", filename)
+                except ClientError as e:
+                    logger.error("❌ Verification failed: File NOT found in R2 after upload")
+                    raise Exception(f"Upload verification failed: {str(e)}")
             
             # Return public URL
             public_url = f"https://{self.bucket_name}.{os.getenv('R2_ENDPOINT_URL', '').replace('https://', '')}/videos/{filename}"
-            print(f"Public URL: {public_url}")
+            logger.info("Upload complete, public URL: %s", public_url)
             return public_url
             
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            error_message = e.response['Error']['Message']
-            print(f"R2 ClientError: {error_code} - {error_message}")
+        except (ClientError, S3UploadFailedError) as e:
+            # The transfer manager can wrap R2's ClientError in S3UploadFailedError
+            client_error = e if isinstance(e, ClientError) else (e.__cause__ or e.__context__)
+            if not isinstance(client_error, ClientError):
+                logger.error("R2 upload failed: %s", e)
+                raise Exception(f"R2 upload failed: {str(e)}")
+            error_code = client_error.response['Error']['Code']
+            error_message = client_error.response['Error']['Message']
+            logger.error("R2 ClientError: %s - %s", error_code, error_message)
             raise Exception(f"R2 upload failed ({error_code}): {error_message}")
         except Exception as e:
-            print(f"Upload error: {str(e)}")
+            logger.error("Upload error: %s", e)
             raise Exception(f"Failed to upload video: {str(e)}")
     
     @retry_on_failure(max_attempts=3, delay=2)
@@ -99,90 +137,125 @@ class StorageService:
         """Download video from R2 to local temp file"""
         try:
             key = f"videos/{filename}"
-            local_path = f"/tmp/{filename}"
             
-            logger.info(f"Attempting to download from R2:")
-            logger.info(f"  Bucket: {self.bucket_name}")
-            logger.info(f"  Key: {key}")
-            logger.info(f"  Local path: {local_path}")
+            logger.info("Attempting to download from R2:")
+            logger.info("  Bucket: %s", self.bucket_name)
+            logger.info("  Key: %s", key)
             
             # Check if file exists first
             try:
-                self.s3_client.head_object(
+                await asyncio.to_thread(
+                    self.s3_client.head_object,
                     Bucket=self.bucket_name,
                     Key=key
                 )
-                logger.info(f"✅ File exists in R2, proceeding with download")
+                logger.info("✅ File exists in R2, proceeding with download")
             except ClientError as e:
                 if e.response['Error']['Code'] == '404':
-                    logger.error(f"❌ File not found in R2: {key}")
+                    logger.error("❌ File not found in R2: %s", key)
                     raise Exception(
                         f"Video not found in storage. The video may have expired or failed to upload. "
                         f"Please try uploading again."
                     )
                 raise
             
-            self.s3_client.download_file(
-                self.bucket_name,
+            # Unique path per call, so concurrent analyses of one upload don't share a file
+            local_path = await asyncio.to_thread(
+                self._download_to_temp_file,
                 key,
-                local_path
+                os.path.splitext(filename)[1]
             )
             
-            logger.info(f"✅ Successfully downloaded video to {local_path}")
+            logger.info("✅ Successfully downloaded video to %s", local_path)
             
             # Verify local file exists and get size
-            import os
             if not os.path.exists(local_path):
                 raise Exception(f"Video file not found at {local_path}")
             
             file_size = os.path.getsize(local_path)
-            logger.info(f"  Local file size: {file_size} bytes ({file_size / (1024*1024):.2f} MB)")
+            logger.info("  Local file size: %d bytes (%.2f MB)", file_size, file_size / (1024*1024))
             
             return local_path
         except Exception as e:
-            logger.error(f"Failed to download video: {str(e)}")
+            logger.error("Failed to download video: %s", e)
             raise Exception(f"Failed to download video: {str(e)}")
     
+    def _download_to_temp_file(self, key: str, suffix: str) -> str:
+        """Download an object to a new temp file, leaving /dev/shm for disk if it fills up"""
+        directories = [DOWNLOAD_DIR]
+        if DOWNLOAD_DIR != tempfile.gettempdir():
+            directories.append(tempfile.gettempdir())
+        
+        for i, directory in enumerate(directories):
+            with tempfile.NamedTemporaryFile(dir=directory, suffix=suffix, delete=False) as tmp:
+                local_path = tmp.name
+            try:
+                self.s3_client.download_file(self.bucket_name, key, local_path)
+                return local_path
+            except OSError as e:
+                os.unlink(local_path)
+                if e.errno != errno.ENOSPC or i == len(directories) - 1:
+                    raise
+                logger.warning("%s is full, downloading %s to %s instead", directory, key, directories[i + 1])
+            except BaseException:
+                os.unlink(local_path)
+                raise
+    
     async def upload_screenshots(self, screenshot_paths: List[str], file_id: str) -> List[str]:
         """Upload annotated screenshots to R2 and return URLs"""
         urls = []
         
-        print(f"Uploading {len(screenshot_paths)} screenshots for file_id: {file_id}")
+        logger.info("Uploading %d screenshots for file_id: %s", len(screenshot_paths), file_id)
         
         try:
-            for i, screenshot_path in enumerate(screenshot_paths):
-                print(f"Uploading screenshot {i+1}: {screenshot_path}")
-                
+            uploads = []
+            for screenshot_path in screenshot_paths:
                 if not os.path.exists(screenshot_path):
-                    print(f"Warning: Screenshot file does not exist: {screenshot_path}")
+                    logger.warning("Screenshot file does not exist: %s", screenshot_path)
                     continue
-                
-                screenshot_key = f"screenshots/{file_id}/screenshot_{i+1}.jpg"
-                
-                with open(screenshot_path, 'rb') as f:
-                    self.s3_client.put_object(
-                        Bucket=self.bucket_name,
-                        Key=screenshot_key,
-                        Body=f.read(),
-                        ContentType='image/jpeg',
-                        ACL='public-read'
-                    )
-                
-                # Use R2 public URL directly
-                public_url = os.getenv('R2_PUBLIC_URL', '')
-                if not public_url:
-                    raise Exception("R2_PUBLIC_URL not configured")
-                
-                url = f"{public_url}/{screenshot_key}"
-                urls.append(url)
-                print(f"Uploaded screenshot to: {url}")
-                
-                # Clean up local file
-                os.remove(screenshot_path)
+                uploads.append(screenshot_path)
+            
+            # Use R2 public URL directly
+            if uploads and not self.public_url:
+                raise Exception("R2_PUBLIC_URL not configured")
+            
+            # Upload all screenshots concurrently so the round-trips overlap
+            urls = await asyncio.gather(*[
+                asyncio.to_thread(self._upload_screenshot, screenshot_path)
+                for screenshot_path in uploads
+            ])
                 
         except Exception as e:
-            print(f"Error uploading screenshots: {str(e)}")
+            logger.error("Error uploading screenshots: %s", e)
             raise Exception(f"Failed to upload screenshots: {str(e)}")
         
-        print(f"Successfully uploaded {len(urls)} screenshots")
+        logger.info("Successfully uploaded %d screenshots", len(urls))
         return urls
+    
+    def _upload_screenshot(self, screenshot_path: str) -> str:
+        """Upload a single screenshot, remove the local copy and return its URL"""
+        with open(screenshot_path, 'rb') as f:
+            body = f.read()
+        
+        # Key by content so repeat analyses reuse screenshots already in R2
+        ext = os.path.splitext(screenshot_path)[1].lower() or '.jpg'
+        screenshot_key = f"screenshots/{hashlib.blake2b(body, digest_size=16).hexdigest()}{ext}"
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=screenshot_key)
+            logger.debug("Screenshot already in R2: %s", screenshot_key)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('404', 'NoSuchKey'):
+                raise
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=screenshot_key,
+                Body=body,
+                ContentType=SCREENSHOT_CONTENT_TYPES.get(ext, 'image/jpeg'),
+                ACL='public-read'
+            )
+        
+        url = f"{self.public_url}/{screenshot_key}"
+        
+        # Clean up local file
+        os.remove(screenshot_path)
+        return url
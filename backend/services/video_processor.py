@@ -1,14 +1,24 @@
 import os
+import stat
+import shutil
 import logging
-import subprocess
 from typing import Tuple, Optional
 import tempfile
 
 logger = logging.getLogger(__name__)
 
+HEADER_SIZE = 100  # Bytes read from the start of a file for the signature check
+
+# Validation only reads, so don't leak the fd into children or touch the inode's atime
+OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0)
+NOATIME_FLAG = getattr(os, 'O_NOATIME', 0)
+
 class VideoProcessor:
     """Handles video preprocessing and validation for Gemini analysis"""
     
+    # Leading bytes of MP4/MOV (ftyp box, or its size prefix) and Matroska/WebM (EBML)
+    VIDEO_SIGNATURES = (b'ftyp', b'\x00\x00\x00', b'\x1a\x45\xdf\xa3')
+    
     def __init__(self):
         self.max_duration = 30  # seconds
         self.max_file_size = 50 * 1024 * 1024  # 50MB
@@ -18,59 +28,70 @@ class VideoProcessor:
     async def validate_video(self, video_path: str) -> Tuple[bool, str]:
         """Validate video file and return (is_valid, error_message)"""
         try:
-            # Check if file exists
-            if not os.path.exists(video_path):
+            # One descriptor serves the existence, size and header checks
+            try:
+                try:
+                    fd = os.open(video_path, OPEN_FLAGS | NOATIME_FLAG)
+                except PermissionError:
+                    if not NOATIME_FLAG:
+                        raise
+                    # O_NOATIME needs file ownership
+                    fd = os.open(video_path, OPEN_FLAGS)
+            except FileNotFoundError:
                 return False, "Video file not found"
             
-            # Check file size
-            file_size = os.path.getsize(video_path)
-            if file_size == 0:
-                return False, "Video file is empty"
-            
-            if file_size > self.max_file_size:
-                return False, f"Video file too large ({file_size / (1024*1024):.1f}MB > 50MB)"
-            
-            # Basic file validation (no ffprobe dependency)
-            # Check file extension
-            valid_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
-            file_ext = os.path.splitext(video_path)[1].lower()
-            
-            if file_ext not in valid_extensions:
-                return False, f"Unsupported file format: {file_ext}"
-            
-            # Check if file looks like a video (not text)
             try:
-                with open(video_path, 'rb') as f:
-                    first_bytes = f.read(100)
-                    # Check if it starts with common video file signatures
-                    if first_bytes.startswith(b'ftyp') or first_bytes.startswith(b'\x00\x00\x00'):
-                        logger.info(f"✅ Video validation passed: {file_size / (1024*1024):.1f}MB")
-                        return True, ""
-                    elif first_bytes.startswith(b'RIFF') and b'AVI' in first_bytes:
-                        logger.info(f"✅ Video validation passed: {file_size / (1024*1024):.1f}MB")
-                        return True, ""
-                    elif first_bytes.startswith(b'\x1a\x45\xdf\xa3'):
-                        logger.info(f"✅ Video validation passed: {file_size / (1024*1024):.1f}MB")
-                        return True, ""
-                    else:
-                        # Check if it's clearly text (like our dummy file)
-                        try:
-                            first_bytes.decode('utf-8')
-                            return False, "File appears to be text, not a video"
-                        except UnicodeDecodeError:
-                            # Not text, probably binary video data
-                            logger.info(f"✅ Video validation passed: {file_size / (1024*1024):.1f}MB")
-                            return True, ""
-            except Exception as e:
-                logger.warning(f"Could not read file header: {e}")
-                # If we can't read the header, assume it's valid
-                logger.info(f"✅ Video validation passed (basic): {file_size / (1024*1024):.1f}MB")
-                return True, ""
+                st = os.fstat(fd)
+                if not stat.S_ISREG(st.st_mode):
+                    return False, "Video file not found"
+                
+                file_ext = os.path.splitext(video_path)[1].lower()
+                return self._check_video(fd, st.st_size, file_ext)
+            finally:
+                os.close(fd)
                 
         except Exception as e:
             logger.error(f"Video validation error: {str(e)}")
             return False, f"Validation error: {str(e)}"
     
+    def _check_video(self, fd: int, file_size: int, file_ext: str) -> Tuple[bool, str]:
+        """Size, extension and header checks on an open video file"""
+        if file_size == 0:
+            return False, "Video file is empty"
+        
+        if file_size > self.max_file_size:
+            return False, f"Video file too large ({file_size / (1024*1024):.1f}MB > 50MB)"
+        
+        # Basic file validation (no ffprobe dependency)
+        # Check file extension
+        valid_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
+        
+        if file_ext not in valid_extensions:
+            return False, f"Unsupported file format: {file_ext}"
+        
+        # Check if file looks like a video (not text)
+        try:
+            first_bytes = os.pread(fd, HEADER_SIZE, 0)
+        except OSError as e:
+            logger.warning(f"Could not read file header: {e}")
+            # If we can't read the header, assume it's valid
+            logger.info(f"✅ Video validation passed (basic): {file_size / (1024*1024):.1f}MB")
+            return True, ""
+        
+        # Check if it starts with common video file signatures (AVI is RIFF with 'AVI ' at offset 8)
+        if first_bytes.startswith(self.VIDEO_SIGNATURES) or (first_bytes.startswith(b'RIFF') and first_bytes[8:11] == b'AVI'):
+            logger.info(f"✅ Video validation passed: {file_size / (1024*1024):.1f}MB")
+            return True, ""
+        else:
+            # Check if it's clearly text (like our dummy file)
+            try:
+                first_bytes.decode('utf-8')
+                return False, "File appears to be text, not a video"
+            except UnicodeDecodeError:
+                # Not text, probably binary video data
+                logger.info(f"✅ Video validation passed: {file_size / (1024*1024):.1f}MB")
+                return True, ""
+    
     async def optimize_video(self, input_path: str, output_path: str) -> bool:
         """Optimize video for Gemini analysis (simplified - no ffmpeg dependency)"""
         try:
@@ -78,22 +99,40 @@ class VideoProcessor:
             
             # Since ffmpeg is not available, just copy the file
             # Gemini can handle most video formats directly
-            import shutil
-            shutil.copy2(input_path, output_path)
-            
-            # Check output file size
-            output_size = os.path.getsize(output_path)
-            input_size = os.path.getsize(input_path)
+            file_size = self._copy_file(input_path, output_path)
             
-            logger.info(f"✅ Video processed: {input_size / (1024*1024):.1f}MB -> {output_size / (1024*1024):.1f}MB")
+            logger.info(f"✅ Video processed: {file_size / (1024*1024):.1f}MB copied")
             return True
                 
         except Exception as e:
             logger.error(f"Video processing error: {str(e)}")
             return False
     
+    def _copy_file(self, input_path: str, output_path: str) -> int:
+        """Copy a file without passing its bytes through userspace, returning its size"""
+        with open(input_path, 'rb') as src, open(output_path, 'wb') as dst:
+            st = os.fstat(src.fileno())
+            remaining = st.st_size
+            try:
+                # copy_file_range stays in the kernel (and reflinks on CoW filesystems)
+                while remaining:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if not copied:
+                        break
+                    remaining -= copied
+            except (AttributeError, OSError):
+                # Not Linux, or an old kernel / unsupported filesystem pair
+                remaining = st.st_size
+        
+        if remaining:
+            # shutil uses sendfile on Linux and a buffered copy elsewhere
+            shutil.copyfile(input_path, output_path)
+        os.utime(output_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        return st.st_size
+    
     async def process_video_for_analysis(self, video_path: str) -> Optional[str]:
         """Process video for Gemini analysis - validate and optimize"""
+        optimized_path = None
         try:
             logger.info(f"Processing video for analysis: {video_path}")
             
@@ -113,28 +152,27 @@ class VideoProcessor:
                 logger.error("❌ Video optimization failed")
                 raise Exception("Video optimization failed")
             
-            # Step 4: Validate optimized video
-            is_valid, error_msg = await self.validate_video(optimized_path)
-            if not is_valid:
-                logger.error(f"❌ Optimized video validation failed: {error_msg}")
-                os.unlink(optimized_path)
-                raise Exception(f"Optimized video invalid: {error_msg}")
-            
+            # No second validation: optimize_video copies the already-validated
+            # source byte for byte and returns False on failure
             logger.info(f"✅ Video processed successfully: {optimized_path}")
             return optimized_path
             
         except Exception as e:
             logger.error(f"Video processing failed: {str(e)}")
-            # Clean up temp file if it exists
-            if 'optimized_path' in locals() and os.path.exists(optimized_path):
-                os.unlink(optimized_path)
+            # Clean up temp file if it was created
+            if optimized_path is not None:
+                try:
+                    os.unlink(optimized_path)
+                except FileNotFoundError:
+                    pass
             raise
     
     def cleanup_temp_file(self, file_path: str):
         """Clean up temporary file"""
         try:
-            if os.path.exists(file_path):
-                os.unlink(file_path)
-                logger.info(f"Cleaned up temp file: {file_path}")
+            os.unlink(file_path)
+            logger.info(f"Cleaned up temp file: {file_path}")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.warning(f"Failed to cleanup temp file {file_path}: {str(e)}")
@@ -0,0 +1,171 @@
+import math
+import numpy as np
+from typing import List, Dict, Tuple, Union
+
+class AngleCalculator:
+    """Joint angles and body positions from MediaPipe pose landmarks"""
+    
+    # MediaPipe pose landmark indices
+    LEFT_SHOULDER = 11
+    RIGHT_SHOULDER = 12
+    LEFT_HIP = 23
+    RIGHT_HIP = 24
+    LEFT_KNEE = 25
+    RIGHT_KNEE = 26
+    LEFT_ANKLE = 27
+    RIGHT_ANKLE = 28
+    
+    NUM_LANDMARKS = 33  # MediaPipe pose has 33 landmarks
+    MAX_USED_LANDMARK = RIGHT_ANKLE  # Highest index any getter reads
+    
+    # (shoulder, hip, knee, ankle) index vectors for one fancy-index into a landmark row
+    LEFT_SIDE = np.array([LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE])
+    RIGHT_SIDE = np.array([RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE])
+    # (left, right) pairs for shoulders, hips, knees and ankles
+    BILATERAL = np.stack((LEFT_SIDE, RIGHT_SIDE), axis=1)
+    
+    def calculate_angle(self, point1: Tuple[float, float], point2: Tuple[float, float], point3: Tuple[float, float]) -> float:
+        """Calculate angle between three points (point2 is vertex) in degrees"""
+        # Plain float math: 2-D vectors are far too small to amortize NumPy dispatch
+        bax = point1[0] - point2[0]
+        bay = point1[1] - point2[1]
+        bcx = point3[0] - point2[0]
+        bcy = point3[1] - point2[1]
+        
+        if (bax == 0 and bay == 0) or (bcx == 0 and bcy == 0):
+            return math.nan  # Degenerate points have no angle
+        
+        # atan2(|cross|, dot) stays accurate near 0 and 180 degrees, where acos doesn't
+        return math.degrees(math.atan2(abs(bax * bcy - bay * bcx), bax * bcx + bay * bcy))
+    
+    def calculate_distance(self, point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
+        """Calculate distance between two points"""
+        return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
+    
+    def get_landmark_coords(self, landmarks: Union[List[Dict], np.ndarray], landmark_id: int) -> Tuple[float, float]:
+        """Get (x, y) coordinates of a landmark from a dict list or a (33, 3) array row"""
+        if isinstance(landmarks, np.ndarray):
+            return (float(landmarks[landmark_id, 0]), float(landmarks[landmark_id, 1]))
+        if landmark_id < len(landmarks):
+            landmark = landmarks[landmark_id]
+            return (landmark["x"], landmark["y"])
+        return (0.0, 0.0)
+    
+    def _get_coords(self, landmarks: List[Dict], *landmark_ids: int) -> List[Tuple[float, float]]:
+        """(x, y) for several landmarks, bounds-checked once when the list is complete"""
+        if len(landmarks) > self.MAX_USED_LANDMARK:
+            return [(landmarks[i]["x"], landmarks[i]["y"]) for i in landmark_ids]
+        return [self.get_landmark_coords(landmarks, i) for i in landmark_ids]
+    
+    def _get_side(self, side: str) -> Tuple[int, int, int, int]:
+        """Get (shoulder, hip, knee, ankle) indices for one side of the body"""
+        if side == "left":
+            return (self.LEFT_SHOULDER, self.LEFT_HIP, self.LEFT_KNEE, self.LEFT_ANKLE)
+        return (self.RIGHT_SHOULDER, self.RIGHT_HIP, self.RIGHT_KNEE, self.RIGHT_ANKLE)
+    
+    def get_knee_angle(self, landmarks: Union[List[Dict], np.ndarray], side: str) -> float:
+        """Knee flexion angle (hip-knee-ankle)"""
+        if isinstance(landmarks, np.ndarray):
+            _, hip, knee, ankle = landmarks[self.LEFT_SIDE if side == "left" else self.RIGHT_SIDE, :2]
+            return self.calculate_angle(hip, knee, ankle)
+        
+        _, hip, knee, ankle = self._get_side(side)
+        return self.calculate_angle(*self._get_coords(landmarks, hip, knee, ankle))
+    
+    def get_hip_angle(self, landmarks: Union[List[Dict], np.ndarray], side: str) -> float:
+        """Hip angle (shoulder-hip-knee)"""
+        if isinstance(landmarks, np.ndarray):
+            shoulder, hip, knee, _ = landmarks[self.LEFT_SIDE if side == "left" else self.RIGHT_SIDE, :2]
+            return self.calculate_angle(shoulder, hip, knee)
+        
+        shoulder, hip, knee, _ = self._get_side(side)
+        return self.calculate_angle(*self._get_coords(landmarks, shoulder, hip, knee))
+    
+    def get_back_angle(self, landmarks: Union[List[Dict], np.ndarray]) -> float:
+        """Torso lean from vertical in degrees (0 = upright)"""
+        if isinstance(landmarks, np.ndarray):
+            shoulders, hips, _, _ = landmarks[self.BILATERAL, :2].mean(axis=1)
+            return float(np.degrees(np.arctan2(abs(shoulders[0] - hips[0]), hips[1] - shoulders[1])))
+        
+        left_shoulder, right_shoulder, left_hip, right_hip = self._get_coords(
+            landmarks, self.LEFT_SHOULDER, self.RIGHT_SHOULDER, self.LEFT_HIP, self.RIGHT_HIP
+        )
+        
+        dx = (left_shoulder[0] + right_shoulder[0]) / 2 - (left_hip[0] + right_hip[0]) / 2
+        dy = (left_hip[1] + right_hip[1]) / 2 - (left_shoulder[1] + right_shoulder[1]) / 2
+        return math.degrees(math.atan2(abs(dx), dy))
+    
+    def get_hip_depth(self, landmarks: Union[List[Dict], np.ndarray]) -> float:
+        """Hip height relative to knees (positive = hips below knees)"""
+        if isinstance(landmarks, np.ndarray):
+            _, hips, knees, _ = landmarks[self.BILATERAL, 1].mean(axis=1)
+            return float(hips - knees)
+        
+        left_hip, right_hip, left_knee, right_knee = self._get_coords(
+            landmarks, self.LEFT_HIP, self.RIGHT_HIP, self.LEFT_KNEE, self.RIGHT_KNEE
+        )
+        return (left_hip[1] + right_hip[1]) / 2 - (left_knee[1] + right_knee[1]) / 2
+    
+    def get_knee_valgus(self, landmarks: Union[List[Dict], np.ndarray]) -> float:
+        """Knee width minus ankle width (negative = knees caving inward)"""
+        if isinstance(landmarks, np.ndarray):
+            widths = np.abs(np.diff(landmarks[self.BILATERAL[2:], 0], axis=1))
+            return float(widths[0, 0] - widths[1, 0])
+        
+        left_knee, right_knee, left_ankle, right_ankle = self._get_coords(
+            landmarks, self.LEFT_KNEE, self.RIGHT_KNEE, self.LEFT_ANKLE, self.RIGHT_ANKLE
+        )
+        return abs(left_knee[0] - right_knee[0]) - abs(left_ankle[0] - right_ankle[0])
+    
+    def to_array(self, pose_data: List[Dict]) -> np.ndarray:
+        """Stack per-frame landmark dicts into an (N, 33, 3) float32 array of x, y, z
+        
+        Frames with missing or partial landmarks are left as NaN. float32 matches
+        MediaPipe's output precision and halves memory traffic.
+        """
+        arr = np.full((len(pose_data), self.NUM_LANDMARKS, 3), np.nan, dtype=np.float32)
+        for i, frame_data in enumerate(pose_data):
+            landmarks = frame_data.get("landmarks") or []
+            for j, landmark in enumerate(landmarks[:self.NUM_LANDMARKS]):
+                arr[i, j] = (landmark["x"], landmark["y"], landmark.get("z", 0.0))
+        return arr
+    
+    def batch(self, landmarks: np.ndarray) -> Dict[str, np.ndarray]:
+        """Compute every per-frame metric over an (N, 33, 3) landmark array
+        
+        Returns a dict of length-N arrays; degenerate frames come back as NaN.
+        """
+        xy = landmarks[:, :, :2]
+        # Every left/right midpoint for all frames in one reduction
+        centers = xy[:, self.BILATERAL].mean(axis=2)
+        shoulders, hips, knees = centers[:, 0], centers[:, 1], centers[:, 2]
+        
+        metrics = {}
+        for side in ("left", "right"):
+            shoulder, hip, knee, ankle = self._get_side(side)
+            metrics[f"{side}_hip_angle"] = self.calculate_angles_batch(xy[:, shoulder], xy[:, hip], xy[:, knee])
+            metrics[f"{side}_knee_angle"] = self.calculate_angles_batch(xy[:, hip], xy[:, knee], xy[:, ankle])
+        
+        metrics["back_angle"] = np.degrees(np.arctan2(
+            np.abs(shoulders[:, 0] - hips[:, 0]), hips[:, 1] - shoulders[:, 1]
+        ))
+        metrics["hip_depth"] = hips[:, 1] - knees[:, 1]
+        metrics["knee_valgus"] = (
+            np.abs(xy[:, self.LEFT_KNEE, 0] - xy[:, self.RIGHT_KNEE, 0])
+            - np.abs(xy[:, self.LEFT_ANKLE, 0] - xy[:, self.RIGHT_ANKLE, 0])
+        )
+        return metrics
+    
+    @staticmethod
+    def calculate_angles_batch(point1: np.ndarray, point2: np.ndarray, point3: np.ndarray) -> np.ndarray:
+        """Vectorized calculate_angle over (N, 2) point arrays, NaN for degenerate rows"""
+        ba = point1 - point2
+        bc = point3 - point2
+        # einsum fuses the multiply and row sum without an (N, 2) temporary
+        dot = np.einsum('ij,ij->i', ba, bc)
+        cross = ba[:, 0] * bc[:, 1] - ba[:, 1] * bc[:, 0]
+        angles = np.degrees(np.arctan2(np.abs(cross), dot))
+        
+        degenerate = (np.einsum('ij,ij->i', ba, ba) == 0) | (np.einsum('ij,ij->i', bc, bc) == 0)
+        angles[degenerate] = np.nan
+        return angles
@@ -0,0 +1,141 @@
+import math
+import numpy as np
+from utils.angle_calculator import AngleCalculator
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional - callers fall back to their NumPy paths
+    njit = None
+    prange = range
+
+HAS_NUMBA = njit is not None
+
+LEFT_SHOULDER = AngleCalculator.LEFT_SHOULDER
+RIGHT_SHOULDER = AngleCalculator.RIGHT_SHOULDER
+LEFT_HIP = AngleCalculator.LEFT_HIP
+RIGHT_HIP = AngleCalculator.RIGHT_HIP
+LEFT_KNEE = AngleCalculator.LEFT_KNEE
+RIGHT_KNEE = AngleCalculator.RIGHT_KNEE
+LEFT_ANKLE = AngleCalculator.LEFT_ANKLE
+RIGHT_ANKLE = AngleCalculator.RIGHT_ANKLE
+
+# Per-frame deadlift values used where an angle is undefined, and the issue thresholds;
+# shared by the compiled kernels below and DeadliftAnalyzer's NumPy path
+FALLBACK_BACK_ANGLE = 20.0  # Slightly forward lean
+FALLBACK_HIP_ANGLE = 45.0
+FALLBACK_KNEE_ANGLE = 95.0
+BACK_ROUNDING_ANGLE = 30.0  # Back angle above this counts as rounding
+HIGH_HIP_ANGLE = 120.0  # Hip angle above this is squatting the lift
+KNEE_BEND_ANGLE = 90.0  # Knee angle below this is too much knee bend
+BAR_PATH_BACK_ANGLE = 15.0  # Back angle the simulated bar path is measured from
+BAR_PATH_SCALE = 100.0
+BAR_DRIFT = 0.1  # Bar path deviation above this is drifting from the body
+
+# Knee angle for rep detection where it is undefined
+NEUTRAL_KNEE_ANGLE = 90.0
+
+def _jit(func=None, parallel=False):
+    """Compile with numba when available, otherwise leave as plain Python"""
+    if func is None:
+        return lambda f: _jit(f, parallel=parallel)
+    if njit is None:
+        return func
+    # fastmath without 'nnan'/'ninf' so the NaN fallbacks below stay intact
+    return njit(cache=True, parallel=parallel, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})(func)
+
+@_jit
+def _angle(ax, ay, bx, by, cx, cy):
+    """Angle at (bx, by) in degrees, NaN for degenerate points"""
+    v1x = ax - bx
+    v1y = ay - by
+    v2x = cx - bx
+    v2y = cy - by
+    if (v1x == 0.0 and v1y == 0.0) or (v2x == 0.0 and v2y == 0.0):
+        return math.nan
+    return math.degrees(math.atan2(abs(v1x * v2y - v1y * v2x), v1x * v2x + v1y * v2y))
+
+@_jit
+def _joint_angle(lm, a, b, c):
+    """Angle at landmark b formed by landmarks a-b-c"""
+    return _angle(lm[a, 0], lm[a, 1], lm[b, 0], lm[b, 1], lm[c, 0], lm[c, 1])
+
+@_jit(parallel=True)
+def deadlift_frame_metrics(landmarks, frame_indices):
+    """Per-frame deadlift metrics and issue counts in a single compiled loop
+    
+    Returns (back_angle, hip_angle, knee_angle, bar_path_deviation, counts) where
+    counts tallies back rounding, hip angle, knee angle and bar path issues.
+    Frames are independent, so the loop is spread across cores with prange.
+    """
+    n = frame_indices.shape[0]
+    back_angle = np.empty(n, dtype=np.float32)
+    hip_angle = np.empty(n, dtype=np.float32)
+    knee_angle = np.empty(n, dtype=np.float32)
+    bar_path_deviation = np.empty(n, dtype=np.float32)
+    back_rounding = 0
+    high_hips = 0
+    knee_bend = 0
+    bar_drift = 0
+    
+    for k in prange(n):
+        lm = landmarks[frame_indices[k]]
+        
+        dx = (lm[LEFT_SHOULDER, 0] + lm[RIGHT_SHOULDER, 0]) / 2 - (lm[LEFT_HIP, 0] + lm[RIGHT_HIP, 0]) / 2
+        dy = (lm[LEFT_HIP, 1] + lm[RIGHT_HIP, 1]) / 2 - (lm[LEFT_SHOULDER, 1] + lm[RIGHT_SHOULDER, 1]) / 2
+        back = math.degrees(math.atan2(abs(dx), dy))
+        
+        left_hip = _joint_angle(lm, LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)
+        right_hip = _joint_angle(lm, RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE)
+        left_knee = _joint_angle(lm, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+        right_knee = _joint_angle(lm, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+        
+        # Fallback values where angle calculation failed
+        if math.isnan(back):
+            back = FALLBACK_BACK_ANGLE
+        if math.isnan(left_hip):
+            left_hip = FALLBACK_HIP_ANGLE
+        if math.isnan(right_hip):
+            right_hip = FALLBACK_HIP_ANGLE
+        if math.isnan(left_knee):
+            left_knee = FALLBACK_KNEE_ANGLE
+        if math.isnan(right_knee):
+            right_knee = FALLBACK_KNEE_ANGLE
+        
+        hip = (left_hip + right_hip) / 2
+        knee = (left_knee + right_knee) / 2
+        bar = abs(back - BAR_PATH_BACK_ANGLE) / BAR_PATH_SCALE
+        
+        back_angle[k] = back
+        hip_angle[k] = hip
+        knee_angle[k] = knee
+        bar_path_deviation[k] = bar
+        
+        # Scalar reductions are safe across prange iterations
+        if back > BACK_ROUNDING_ANGLE:
+            back_rounding += 1
+        if hip > HIGH_HIP_ANGLE:
+            high_hips += 1
+        if knee < KNEE_BEND_ANGLE:
+            knee_bend += 1
+        if bar > BAR_DRIFT:
+            bar_drift += 1
+    
+    counts = np.zeros(4, dtype=np.int32)
+    counts[0] = back_rounding
+    counts[1] = high_hips
+    counts[2] = knee_bend
+    counts[3] = bar_drift
+    return back_angle, hip_angle, knee_angle, bar_path_deviation, counts
+
+@_jit(parallel=True)
+def rep_knee_angles(landmarks):
+    """Hip-knee-ankle angle per frame averaged over both sides, 90 where undefined"""
+    n = landmarks.shape[0]
+    angles = np.empty(n, dtype=np.float32)
+    
+    for i in prange(n):
+        lm = landmarks[i]
+        angle = (_joint_angle(lm, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+                 + _joint_angle(lm, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)) / 2
+        angles[i] = NEUTRAL_KNEE_ANGLE if math.isnan(angle) else angle
+    return angles
@@ -1,39 +1,71 @@
 import numpy as np
-from typing import List, Dict, Tuple, Any
-from scipy.signal import find_peaks
+from typing import List, Dict, Any, Union
+from utils.angle_calculator import AngleCalculator
+from utils.pose_kernels import HAS_NUMBA, NEUTRAL_KNEE_ANGLE, rep_knee_angles
+
+def _find_peaks(x: np.ndarray, distance: int) -> np.ndarray:
+    """NumPy-only equivalent of scipy.signal.find_peaks(x, distance=distance)
+    
+    Local maxima are found with whole-array comparisons over runs of equal
+    values (a flat peak reports its middle sample), then peaks closer than
+    distance are dropped, keeping the highest first as SciPy does.
+    """
+    n = len(x)
+    if n < 3:
+        return np.empty(0, dtype=np.intp)
+    
+    # Runs of equal values; a run is a peak if both neighbours are strictly lower
+    run_starts = np.flatnonzero(np.concatenate(([True], x[1:] != x[:-1])))
+    run_ends = np.concatenate((run_starts[1:], [n])) - 1
+    inner = (run_starts > 0) & (run_ends < n - 1)
+    run_starts, run_ends = run_starts[inner], run_ends[inner]
+    is_peak = (x[run_starts - 1] < x[run_starts]) & (x[run_ends + 1] < x[run_starts])
+    peaks = (run_starts[is_peak] + run_ends[is_peak]) // 2
+    
+    if distance > 1 and len(peaks) > 1:
+        keep = np.ones(len(peaks), dtype=bool)
+        # Tallest peaks claim their neighbourhood first
+        for j in np.argsort(x[peaks])[::-1]:
+            if not keep[j]:
+                continue
+            near = np.abs(peaks - peaks[j]) < distance
+            keep[near] = False
+            keep[j] = True
+        peaks = peaks[keep]
+    return peaks
 
 class RepDetector:
     """Detects individual reps from pose data by tracking angle cycles"""
     
     def __init__(self):
+        self.angle_calc = AngleCalculator()
         self.min_rep_duration = 10  # Minimum frames for a rep
         self.smoothing_window = 5   # Smoothing window for angle data
     
-    def detect_reps(self, pose_data: List[Dict], exercise_type: str) -> List[Tuple[int, int]]:
+    def detect_reps(self, pose_data: Union[List[Dict], np.ndarray], exercise_type: str) -> np.ndarray:
         """
         Detect individual reps from pose data
         
         Args:
-            pose_data: List of pose data dictionaries
+            pose_data: List of pose data dictionaries, or an (N, 33, 3) landmark array
             exercise_type: Type of exercise ('squat', 'deadlift', etc.)
             
         Returns:
-            List of (start_frame, end_frame) tuples for each rep
+            (num_reps, 2) int array of (start_frame, end_frame) rows
         """
-        if not pose_data or len(pose_data) < self.min_rep_duration:
-            return []
+        if len(pose_data) < self.min_rep_duration:
+            return np.empty((0, 2), dtype=np.int32)
+        
+        landmarks = pose_data if isinstance(pose_data, np.ndarray) else self.angle_calc.to_array(pose_data)
         
         # Extract angle data based on exercise type
         if exercise_type in ['squat', 'front_squat']:
-            angles = self._extract_squat_angles(pose_data)
+            angles = self._extract_squat_angles(landmarks)
         elif exercise_type in ['deadlift', 'conventional_deadlift', 'sumo_deadlift']:
-            angles = self._extract_deadlift_angles(pose_data)
+            angles = self._extract_deadlift_angles(landmarks)
         else:
             # Fallback to hip angle
-            angles = self._extract_hip_angles(pose_data)
-        
-        if not angles:
-            return []
+            angles = self._extract_hip_angles(landmarks)
         
         # Smooth the angle data
         smoothed_angles = self._smooth_angles(angles)
@@ -42,172 +74,88 @@ class RepDetector:
         rep_boundaries = self._find_rep_boundaries(smoothed_angles)
         
         # Filter out very short reps
-        valid_reps = []
-        for start, end in rep_boundaries:
-            if end - start >= self.min_rep_duration:
-                valid_reps.append((start, end))
-        
-        return valid_reps
+        return rep_boundaries[rep_boundaries[:, 1] - rep_boundaries[:, 0] >= self.min_rep_duration]
     
-    def _extract_squat_angles(self, pose_data: List[Dict]) -> List[float]:
+    def _extract_squat_angles(self, landmarks: np.ndarray) -> np.ndarray:
         """Extract hip angles for squat detection"""
-        angles = []
-        for frame_data in pose_data:
-            landmarks = frame_data.get("landmarks", [])
-            if landmarks and len(landmarks) >= 24:  # MediaPipe pose has 33 landmarks
-                # Calculate hip angle (hip-knee-ankle)
-                try:
-                    hip_angle = self._calculate_hip_angle(landmarks)
-                    angles.append(hip_angle)
-                except:
-                    angles.append(90)  # Default neutral angle
-            else:
-                angles.append(90)  # Default when landmarks not available
-        return angles
+        return self._extract_hip_angles(landmarks)
     
-    def _extract_deadlift_angles(self, pose_data: List[Dict]) -> List[float]:
+    def _extract_deadlift_angles(self, landmarks: np.ndarray) -> np.ndarray:
         """Extract hip angles for deadlift detection"""
-        angles = []
-        for frame_data in pose_data:
-            landmarks = frame_data.get("landmarks", [])
-            if landmarks and len(landmarks) >= 24:
-                try:
-                    # For deadlift, use hip angle relative to vertical
-                    hip_angle = self._calculate_hip_angle(landmarks)
-                    angles.append(hip_angle)
-                except:
-                    angles.append(90)
-            else:
-                angles.append(90)
-        return angles
-    
-    def _extract_hip_angles(self, pose_data: List[Dict]) -> List[float]:
-        """Fallback hip angle extraction"""
-        return self._extract_squat_angles(pose_data)
-    
-    def _calculate_hip_angle(self, landmarks: List[Dict]) -> float:
-        """Calculate hip angle from landmarks"""
-        try:
-            # MediaPipe pose landmarks
-            # Hip: 23 (left), 24 (right)
-            # Knee: 25 (left), 26 (right) 
-            # Ankle: 27 (left), 28 (right)
-            
-            left_hip = landmarks[23]
-            right_hip = landmarks[24]
-            left_knee = landmarks[25]
-            right_knee = landmarks[26]
-            left_ankle = landmarks[27]
-            right_ankle = landmarks[28]
-            
-            # Use average of left and right sides
-            left_angle = self._angle_between_points(
-                left_hip, left_knee, left_ankle
-            )
-            right_angle = self._angle_between_points(
-                right_hip, right_knee, right_ankle
-            )
-            
-            return (left_angle + right_angle) / 2
-            
-        except (IndexError, KeyError, TypeError):
-            return 90  # Default neutral angle
+        return self._extract_hip_angles(landmarks)
     
-    def _angle_between_points(self, p1: Dict, p2: Dict, p3: Dict) -> float:
-        """Calculate angle between three points (p2 is vertex)"""
-        try:
-            # Convert to numpy arrays for easier calculation
-            a = np.array([p1['x'], p1['y']])
-            b = np.array([p2['x'], p2['y']])
-            c = np.array([p3['x'], p3['y']])
-            
-            # Calculate vectors
-            ba = a - b
-            bc = c - b
-            
-            # Calculate angle
-            cos_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-            cos_angle = np.clip(cos_angle, -1.0, 1.0)  # Avoid numerical errors
-            angle = np.arccos(cos_angle)
-            
-            return np.degrees(angle)
-            
-        except (KeyError, TypeError, ValueError):
-            return 90  # Default neutral angle
+    def _extract_hip_angles(self, landmarks: np.ndarray) -> np.ndarray:
+        """Hip-knee-ankle angle per frame, averaged over both sides"""
+        if HAS_NUMBA:
+            return rep_knee_angles(landmarks)
+        
+        metrics = self.angle_calc.batch(landmarks)
+        angles = (metrics["left_knee_angle"] + metrics["right_knee_angle"]) / 2
+        
+        # Missing landmarks and degenerate geometry come back as NaN
+        return np.where(np.isnan(angles), NEUTRAL_KNEE_ANGLE, angles)
     
-    def _smooth_angles(self, angles: List[float]) -> List[float]:
+    def _smooth_angles(self, angles: np.ndarray) -> np.ndarray:
         """Smooth angle data to reduce noise"""
         if len(angles) < self.smoothing_window:
             return angles
         
-        smoothed = []
-        for i in range(len(angles)):
-            start_idx = max(0, i - self.smoothing_window // 2)
-            end_idx = min(len(angles), i + self.smoothing_window // 2 + 1)
-            window_angles = angles[start_idx:end_idx]
-            smoothed.append(np.mean(window_angles))
-        
-        return smoothed
+        # Centered moving average; windows shrink at the edges, so divide by
+        # how many samples each output actually covered
+        kernel = np.ones(2 * (self.smoothing_window // 2) + 1)
+        sums = np.convolve(angles, kernel, mode='same')
+        counts = np.convolve(np.ones(len(angles)), kernel, mode='same')
+        return np.divide(sums, counts, out=sums)
     
-    def _find_rep_boundaries(self, angles: List[float]) -> List[Tuple[int, int]]:
-        """Find rep boundaries using peak detection"""
+    def _find_rep_boundaries(self, angles: np.ndarray) -> np.ndarray:
+        """Find rep boundaries using peak detection, as (num_reps, 2) rows"""
         if len(angles) < 10:
-            return []
+            return np.empty((0, 2), dtype=np.int32)
         
-        # Convert to numpy array
-        angle_array = np.array(angles)
+        angle_array = np.asarray(angles)
         
         # Find peaks (standing position) and valleys (bottom position)
         # For squats: peaks are standing (larger angles), valleys are bottom (smaller angles)
         # For deadlifts: peaks are standing (larger angles), valleys are bottom (smaller angles)
         
-        # Find valleys (bottom of movement)
-        valleys, _ = find_peaks(-angle_array, distance=self.min_rep_duration)
-        
         # Find peaks (top of movement) 
-        peaks, _ = find_peaks(angle_array, distance=self.min_rep_duration)
+        peaks = _find_peaks(angle_array, self.min_rep_duration)
+        
+        # Find valleys (bottom of movement) by negating the buffer in place
+        # rather than allocating a negated copy
+        np.negative(angle_array, out=angle_array)
+        valleys = _find_peaks(angle_array, self.min_rep_duration)
+        np.negative(angle_array, out=angle_array)
         
         # Combine and sort all key points
-        key_points = sorted(list(peaks) + list(valleys))
+        key_points = np.sort(np.concatenate((peaks, valleys)))
         
         if len(key_points) < 2:
             # If we can't find clear reps, treat the whole video as one rep
-            return [(0, len(angles) - 1)]
-        
-        # Create rep boundaries
-        rep_boundaries = []
+            return np.array([[0, len(angles) - 1]], dtype=np.int32)
         
-        # Start from the beginning
-        start = 0
-        for i, point in enumerate(key_points):
-            if i == 0:
-                continue
-            
-            # End of current rep
-            end = point
-            if end - start >= self.min_rep_duration:
-                rep_boundaries.append((start, end))
-            
-            # Start of next rep
-            start = point
+        # Each rep runs from one key point to the next, the first starting at frame 0
+        starts = np.concatenate(([0], key_points[1:-1]))
+        ends = key_points[1:]
+        boundaries = np.stack((starts, ends), axis=1)
+        boundaries = boundaries[ends - starts >= self.min_rep_duration]
         
         # Add the last rep if it's long enough
-        if len(angles) - start >= self.min_rep_duration:
-            rep_boundaries.append((start, len(angles) - 1))
+        if len(angles) - key_points[-1] >= self.min_rep_duration:
+            boundaries = np.concatenate((boundaries, [[key_points[-1], len(angles) - 1]]))
         
-        return rep_boundaries
+        return boundaries.astype(np.int32)
     
-    def get_rep_data(self, pose_data: List[Dict], rep_boundaries: List[Tuple[int, int]]) -> List[Dict]:
-        """Extract pose data for each rep"""
+    def get_rep_data(self, landmarks: np.ndarray, rep_boundaries: np.ndarray) -> List[Dict]:
+        """Slice the landmark array for each rep (views, no copies)"""
         rep_data = []
         
         for start, end in rep_boundaries:
-            rep_frames = pose_data[start:end+1]
             rep_data.append({
-                'start_frame': start,
-                'end_frame': end,
-                'frames': rep_frames,
-                'duration': end - start + 1
+                'start_frame': int(start),
+                'end_frame': int(end),
+                'landmarks': landmarks[start:end+1],
+                'duration': int(end - start + 1)
             })
         
         return rep_data
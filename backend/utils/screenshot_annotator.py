@@ -1,359 +1,369 @@
 import cv2
+import math
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Union, Optional
 import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 from utils.angle_calculator import AngleCalculator
 
+ISSUE_CACHE_SIZE = 256  # Issue lists kept per (exercise, landmark array) for repeated poses
+
+# Overlays bound the visible quality, so q=85 with optimized Huffman tables is
+# indistinguishable from the default q=95 at well under its size
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 85, cv2.IMWRITE_JPEG_OPTIMIZE, 1, cv2.IMWRITE_JPEG_PROGRESSIVE, 0]
+
+# Encoder settings per output extension; SCREENSHOT_FORMAT picks one
+ENCODE_PARAMS = {
+    ".jpg": JPEG_PARAMS,
+    ".webp": [cv2.IMWRITE_WEBP_QUALITY, 80],  # Noticeably smaller than JPEG for overlay-heavy frames
+}
+
+# Landmark marker style: filled dots
+LANDMARK_RADIUS = 5
+LANDMARK_COLOR = (0, 255, 0)  # Green
+
+# Issue label text style
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+LABEL_SCALE = 0.6
+LABEL_THICKNESS = 2
+
+# Annotation colors (BGR) by issue type
+SQUAT_COLORS = {
+    "depth": (0, 0, 255),      # Red
+    "knee_tracking": (0, 255, 255),  # Yellow
+    "back_angle": (255, 0, 0)  # Blue
+}
+DEADLIFT_COLORS = {
+    "back_rounding": (0, 0, 255),      # Red
+    "hip_angle": (0, 255, 255),       # Yellow
+    "bar_path": (255, 0, 0)           # Blue
+}
+# Front squat and sumo deadlift issues carry their own "color"
+ISSUE_COLORS = {"squat": SQUAT_COLORS, "deadlift": DEADLIFT_COLORS}
+
 class ScreenshotAnnotator:
+    # Landmarks marked on every screenshot
+    KEY_POINTS = np.array([
+        AngleCalculator.LEFT_SHOULDER,
+        AngleCalculator.RIGHT_SHOULDER,
+        AngleCalculator.LEFT_HIP,
+        AngleCalculator.RIGHT_HIP,
+        AngleCalculator.LEFT_KNEE,
+        AngleCalculator.RIGHT_KNEE,
+        AngleCalculator.LEFT_ANKLE,
+        AngleCalculator.RIGHT_ANKLE
+    ])
+    
     def __init__(self):
         self.angle_calc = AngleCalculator()
         self.temp_dir = "/tmp/annotated"
+        self.output_ext = "." + (os.getenv("SCREENSHOT_FORMAT") or "jpg").lower().lstrip(".")
+        if self.output_ext not in ENCODE_PARAMS:
+            raise ValueError(f"Unsupported SCREENSHOT_FORMAT: {self.output_ext[1:]}")
         os.makedirs(self.temp_dir, exist_ok=True)
+        self._issue_cache = OrderedDict()
+        self._issue_cache_lock = threading.Lock()  # Annotation runs on worker threads
+        self._text_sizes = {}  # Issue messages come from a small fixed set
     
-    async def annotate_squat(self, frame_path: str, landmarks: List[Dict], filename: str) -> str:
+    async def annotate_squat(self, frame_path: Union[str, bytes, np.ndarray], landmarks: List[Dict], filename: str) -> str:
         """Create annotated screenshot for squat analysis"""
         try:
-            # Load image
-            image = cv2.imread(frame_path)
-            if image is None:
-                raise Exception("Could not load image")
-            
-            # Create a copy for annotation
-            annotated = image.copy()
-            
-            # Draw pose landmarks
-            self._draw_pose_landmarks(annotated, landmarks)
-            
-            # Analyze and highlight issues
-            issues = self._analyze_squat_issues(landmarks)
-            
-            # Draw annotations for each issue
-            for i, issue in enumerate(issues):
-                self._draw_squat_annotation(annotated, issue, i)
-            
-            # Save annotated image
-            output_path = os.path.join(self.temp_dir, filename)
-            cv2.imwrite(output_path, annotated)
-            
-            return output_path
-            
+            return await asyncio.to_thread(self._annotate, "squat", frame_path, landmarks, filename)
         except Exception as e:
             raise Exception(f"Failed to annotate squat: {str(e)}")
     
-    async def annotate_deadlift(self, frame_path: str, landmarks: List[Dict], filename: str) -> str:
+    async def annotate_deadlift(self, frame_path: Union[str, bytes, np.ndarray], landmarks: List[Dict], filename: str) -> str:
         """Create annotated screenshot for deadlift analysis"""
         try:
-            # Load image
-            image = cv2.imread(frame_path)
-            if image is None:
-                raise Exception("Could not load image")
-            
-            # Create a copy for annotation
-            annotated = image.copy()
-            
-            # Draw pose landmarks
-            self._draw_pose_landmarks(annotated, landmarks)
-            
-            # Analyze and highlight issues
-            issues = self._analyze_deadlift_issues(landmarks)
-            
-            # Draw annotations for each issue
-            for i, issue in enumerate(issues):
-                self._draw_deadlift_annotation(annotated, issue, i)
-            
-            # Save annotated image
-            output_path = os.path.join(self.temp_dir, filename)
-            cv2.imwrite(output_path, annotated)
-            
-            return output_path
-            
+            return await asyncio.to_thread(self._annotate, "deadlift", frame_path, landmarks, filename)
         except Exception as e:
             raise Exception(f"Failed to annotate deadlift: {str(e)}")
     
-    def _draw_pose_landmarks(self, image: np.ndarray, landmarks: List[Dict]):
-        """Draw pose landmarks on image"""
-        height, width = image.shape[:2]
+    async def annotate_front_squat(self, frame_path: Union[str, bytes, np.ndarray], landmarks: List[Dict], filename: str) -> str:
+        """Create annotated screenshot for front squat analysis"""
+        try:
+            return await asyncio.to_thread(self._annotate, "front_squat", frame_path, landmarks, filename)
+        except Exception as e:
+            print(f"Error annotating front squat: {e}")
+            # Fall back to the unannotated screenshot, which only exists as a file path
+            if isinstance(frame_path, str):
+                return frame_path
+            raise Exception(f"Failed to annotate front squat: {str(e)}")
+    
+    async def annotate_sumo_deadlift(self, frame_path: Union[str, bytes, np.ndarray], landmarks: List[Dict], filename: str) -> str:
+        """Create annotated screenshot for sumo deadlift analysis"""
+        try:
+            return await asyncio.to_thread(self._annotate, "sumo_deadlift", frame_path, landmarks, filename)
+        except Exception as e:
+            print(f"Error annotating sumo deadlift: {e}")
+            # Fall back to the unannotated screenshot, which only exists as a file path
+            if isinstance(frame_path, str):
+                return frame_path
+            raise Exception(f"Failed to annotate sumo deadlift: {str(e)}")
+    
+    async def annotate_batch(self, exercise: str, frames: List[Union[str, bytes, np.ndarray]],
+                             landmarks_list: List[List[Dict]], filenames: List[str]) -> List[str]:
+        """Annotate several frames of one video in a single worker-thread hop"""
+        try:
+            return await asyncio.to_thread(self._annotate_batch, exercise, frames, landmarks_list, filenames)
+        except Exception as e:
+            raise Exception(f"Failed to annotate {exercise.replace('_', ' ')}: {str(e)}")
+    
+    def _annotate_batch(self, exercise: str, frames: List[Union[str, bytes, np.ndarray]],
+                        landmarks_list: List[List[Dict]], filenames: List[str]) -> List[str]:
+        """Run the screenshot pipeline over a batch of frames (blocking)"""
+        return [
+            self._annotate(exercise, frame, landmarks, filename)
+            for frame, landmarks, filename in zip(frames, landmarks_list, filenames)
+        ]
+    
+    def _annotate(self, exercise: str, frame: Union[str, bytes, np.ndarray], landmarks: List[Dict], filename: str) -> str:
+        """Shared screenshot pipeline: load, draw landmarks and issues, save (blocking)"""
+        # Load image; it is a private copy, so draw on it directly
+        annotated = self._load_frame(frame)
+        if annotated is None:
+            raise Exception("Could not load image")
+        
+        # One array per frame feeds drawing and every analyzer below
+        points = self._to_array(landmarks)
+        
+        # Normalized -> pixel multiplier shared by every draw step
+        height, width = annotated.shape[:2]
+        scale = np.array([width, height], dtype=np.float64)
         
+        # Analyze issues; this only reads the landmarks, never the frame
+        issues = self._analyze_issues(exercise, points)
+        
+        # Draw pose landmarks
+        self._draw_pose_landmarks(annotated, points, scale)
+        
+        # Draw annotations for each issue
+        self._draw_annotations(annotated, issues, ISSUE_COLORS.get(exercise, {}), scale)
+        
+        # Save annotated image in the configured format, replacing any extension the caller gave
+        output_path = os.path.join(self.temp_dir, self._output_name(exercise, filename))
+        cv2.imwrite(output_path, annotated, ENCODE_PARAMS[self.output_ext])
+        
+        return output_path
+    
+    def _output_name(self, exercise: str, filename: str) -> str:
+        """Output file name with the configured image extension"""
+        if exercise in ("squat", "deadlift"):
+            # These callers pass a full file name such as "deadlift_summary.jpg"
+            filename = os.path.splitext(filename)[0]
+        return f"{filename}{self.output_ext}"
+    
+    def _load_frame(self, frame: Union[str, bytes, np.ndarray]) -> Optional[np.ndarray]:
+        """Frame as a BGR image from a file path, encoded bytes or an already decoded array
+        
+        Decoded arrays are copied, so drawing never changes the caller's frame.
+        """
+        if isinstance(frame, np.ndarray):
+            return frame.copy()
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            return cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+        return cv2.imread(frame)
+    
+    def _to_array(self, landmarks: List[Dict]) -> np.ndarray:
+        """(33, 4) array of x, y, z, visibility for one frame
+        
+        Missing landmarks get zero coordinates (matching get_landmark_coords'
+        default) and NaN visibility, which marks them as absent.
+        """
+        points = np.zeros((AngleCalculator.NUM_LANDMARKS, 4))
+        points[:, 3] = np.nan
+        for i, landmark in enumerate(landmarks[:AngleCalculator.NUM_LANDMARKS]):
+            points[i] = (landmark["x"], landmark["y"], landmark.get("z", 0.0), landmark["visibility"])
+        return points
+    
+    def _draw_pose_landmarks(self, image: np.ndarray, points: np.ndarray, scale: np.ndarray):
+        """Draw pose landmarks on image"""
         # Draw key landmarks
-        key_points = [
-            AngleCalculator.LEFT_SHOULDER,
-            AngleCalculator.RIGHT_SHOULDER,
-            AngleCalculator.LEFT_HIP,
-            AngleCalculator.RIGHT_HIP,
-            AngleCalculator.LEFT_KNEE,
-            AngleCalculator.RIGHT_KNEE,
-            AngleCalculator.LEFT_ANKLE,
-            AngleCalculator.RIGHT_ANKLE
-        ]
+        key_points = points[self.KEY_POINTS]
+        pixels = (key_points[:, :2] * scale).astype(np.int32)
+        visible = key_points[:, 3] > 0.5  # Only draw if landmark is visible
         
-        for point_id in key_points:
-            if point_id < len(landmarks):
-                landmark = landmarks[point_id]
-                x = int(landmark["x"] * width)
-                y = int(landmark["y"] * height)
-                
-                if landmark["visibility"] > 0.5:  # Only draw if landmark is visible
-                    cv2.circle(image, (x, y), 5, (0, 255, 0), -1)
+        for x, y in pixels[visible].tolist():
+            cv2.circle(image, (x, y), LANDMARK_RADIUS, LANDMARK_COLOR, cv2.FILLED)
+    
+    def _analyze_issues(self, exercise: str, points: np.ndarray) -> List[Dict]:
+        """Run the exercise's issue analysis, reusing results for an identical pose"""
+        # Analyzers only read the key landmarks' x/y and whether they were detected, so
+        # frames that differ elsewhere (face, hands, depth, confidence) share an entry
+        key_points = points[self.KEY_POINTS]
+        pose = key_points[:, :2].tobytes() + np.isnan(key_points[:, 3]).tobytes()
+        cache_key = (exercise, hashlib.blake2b(pose, digest_size=16).digest())
+        with self._issue_cache_lock:
+            issues = self._issue_cache.get(cache_key)
+            if issues is not None:
+                self._issue_cache.move_to_end(cache_key)
+        
+        if issues is None:
+            issues = getattr(self, f"_analyze_{exercise}_issues")(points)
+            with self._issue_cache_lock:
+                self._issue_cache[cache_key] = issues
+                if len(self._issue_cache) > ISSUE_CACHE_SIZE:
+                    self._issue_cache.popitem(last=False)
+        
+        # Issues only hold immutable values, so shallow copies keep the cache intact
+        return [dict(issue) for issue in issues]
     
-    def _analyze_squat_issues(self, landmarks: List[Dict]) -> List[Dict]:
+    def _analyze_squat_issues(self, points: np.ndarray) -> List[Dict]:
         """Analyze squat form issues"""
         issues = []
         
         # Check depth
-        hip_depth = self.angle_calc.get_hip_depth(landmarks)
+        hip_depth = self.angle_calc.get_hip_depth(points)
         if hip_depth < -0.05:
             issues.append({
                 "type": "depth",
                 "message": "Not reaching proper depth",
-                "position": self._get_hip_position(landmarks)
+                "position": self._get_hip_position(points)
             })
         
         # Check knee valgus
-        knee_valgus = self.angle_calc.get_knee_valgus(landmarks)
+        knee_valgus = self.angle_calc.get_knee_valgus(points)
         if abs(knee_valgus) > 0.1:
             issues.append({
                 "type": "knee_tracking",
                 "message": "Knees caving inward",
-                "position": self._get_knee_position(landmarks)
+                "position": self._get_knee_position(points)
             })
         
         # Check back angle
-        back_angle = self.angle_calc.get_back_angle(landmarks)
+        back_angle = self.angle_calc.get_back_angle(points)
         if back_angle > 45:
             issues.append({
                 "type": "back_angle",
                 "message": "Excessive forward lean",
-                "position": self._get_shoulder_position(landmarks)
+                "position": self._get_shoulder_position(points)
             })
         
         return issues
     
-    def _analyze_deadlift_issues(self, landmarks: List[Dict]) -> List[Dict]:
+    def _analyze_deadlift_issues(self, points: np.ndarray) -> List[Dict]:
         """Analyze deadlift form issues"""
         issues = []
         
         # Check back rounding
-        back_angle = self.angle_calc.get_back_angle(landmarks)
+        back_angle = self.angle_calc.get_back_angle(points)
         if back_angle > 30:
             issues.append({
                 "type": "back_rounding",
                 "message": "Back rounding detected",
-                "position": self._get_shoulder_position(landmarks)
+                "position": self._get_shoulder_position(points)
             })
         
         # Check hip angle
-        left_hip_angle = self.angle_calc.get_hip_angle(landmarks, "left")
-        right_hip_angle = self.angle_calc.get_hip_angle(landmarks, "right")
+        left_hip_angle = self.angle_calc.get_hip_angle(points, "left")
+        right_hip_angle = self.angle_calc.get_hip_angle(points, "right")
         avg_hip_angle = (left_hip_angle + right_hip_angle) / 2
         
         if avg_hip_angle > 120:
             issues.append({
                 "type": "hip_angle",
                 "message": "Hips too high - not a squat",
-                "position": self._get_hip_position(landmarks)
+                "position": self._get_hip_position(points)
             })
         
         return issues
     
-    def _draw_squat_annotation(self, image: np.ndarray, issue: Dict, index: int):
-        """Draw annotation for squat issue"""
-        height, width = image.shape[:2]
-        position = issue["position"]
-        
-        # Convert normalized coordinates to pixel coordinates
-        x = int(position[0] * width)
-        y = int(position[1] * height)
-        
-        # Choose color based on issue type
-        colors = {
-            "depth": (0, 0, 255),      # Red
-            "knee_tracking": (0, 255, 255),  # Yellow
-            "back_angle": (255, 0, 0)  # Blue
-        }
-        color = colors.get(issue["type"], (255, 255, 255))
-        
-        # Draw arrow pointing to issue
-        cv2.arrowedLine(image, (x, y - 50), (x, y), color, 3)
+    def _draw_annotations(self, image: np.ndarray, issues: List[Dict], colors: Dict[str, Tuple[int, int, int]],
+                          scale: np.ndarray):
+        """Draw an arrow and labelled text box for every issue"""
+        if not issues:
+            return
         
-        # Draw text box with issue message
-        text = issue["message"]
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.6
-        thickness = 2
+        # Convert all normalized positions to pixel coordinates at once
+        pixels = (np.array([issue["position"] for issue in issues], dtype=np.float64) * scale).astype(np.int32)
         
-        # Get text size
-        (text_width, text_height), baseline = cv2.getTextSize(text, font, font_scale, thickness)
-        
-        # Draw background rectangle
-        cv2.rectangle(image, 
-                     (x - text_width//2 - 10, y - text_height - 20),
-                     (x + text_width//2 + 10, y + baseline),
-                     (0, 0, 0), -1)
-        
-        # Draw text
-        cv2.putText(image, text, 
-                   (x - text_width//2, y - 5),
-                   font, font_scale, color, thickness)
+        for issue, (x, y) in zip(issues, pixels.tolist()):
+            # Choose color based on issue type
+            color = issue.get("color") or colors.get(issue["type"], (255, 255, 255))
+            
+            # Draw arrow pointing to issue
+            cv2.arrowedLine(image, (x, y - 50), (x, y), color, 3)
+            
+            # Draw text box with issue message
+            text = issue["message"]
+            (text_width, text_height), baseline = self._get_text_size(text)
+            
+            # Draw background rectangle
+            cv2.rectangle(image, 
+                         (x - text_width//2 - 10, y - text_height - 20),
+                         (x + text_width//2 + 10, y + baseline),
+                         (0, 0, 0), -1)
+            
+            # Draw text
+            cv2.putText(image, text, 
+                       (x - text_width//2, y - 5),
+                       LABEL_FONT, LABEL_SCALE, color, LABEL_THICKNESS)
     
-    def _draw_deadlift_annotation(self, image: np.ndarray, issue: Dict, index: int):
-        """Draw annotation for deadlift issue"""
-        height, width = image.shape[:2]
-        position = issue["position"]
-        
-        # Convert normalized coordinates to pixel coordinates
-        x = int(position[0] * width)
-        y = int(position[1] * height)
-        
-        # Choose color based on issue type
-        colors = {
-            "back_rounding": (0, 0, 255),      # Red
-            "hip_angle": (0, 255, 255),       # Yellow
-            "bar_path": (255, 0, 0)           # Blue
-        }
-        color = colors.get(issue["type"], (255, 255, 255))
-        
-        # Draw arrow pointing to issue
-        cv2.arrowedLine(image, (x, y - 50), (x, y), color, 3)
-        
-        # Draw text box with issue message
-        text = issue["message"]
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.6
-        thickness = 2
-        
-        # Get text size
-        (text_width, text_height), baseline = cv2.getTextSize(text, font, font_scale, thickness)
-        
-        # Draw background rectangle
-        cv2.rectangle(image, 
-                     (x - text_width//2 - 10, y - text_height - 20),
-                     (x + text_width//2 + 10, y + baseline),
-                     (0, 0, 0), -1)
-        
-        # Draw text
-        cv2.putText(image, text, 
-                   (x - text_width//2, y - 5),
-                   font, font_scale, color, thickness)
+    def _get_text_size(self, text: str) -> Tuple[Tuple[int, int], int]:
+        """cv2.getTextSize for an issue label, measured once per message"""
+        size = self._text_sizes.get(text)
+        if size is None:
+            size = self._text_sizes[text] = cv2.getTextSize(text, LABEL_FONT, LABEL_SCALE, LABEL_THICKNESS)
+        return size
     
-    def _get_hip_position(self, landmarks: List[Dict]) -> Tuple[float, float]:
+    def _get_center(self, points: np.ndarray, left: int, right: int) -> Tuple[float, float]:
+        """Midpoint of a left/right landmark pair"""
+        return ((points[left, 0] + points[right, 0]) / 2, (points[left, 1] + points[right, 1]) / 2)
+    
+    def _get_hip_position(self, points: np.ndarray) -> Tuple[float, float]:
         """Get hip center position"""
-        left_hip = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.LEFT_HIP)
-        right_hip = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.RIGHT_HIP)
-        return ((left_hip[0] + right_hip[0]) / 2, (left_hip[1] + right_hip[1]) / 2)
+        return self._get_center(points, AngleCalculator.LEFT_HIP, AngleCalculator.RIGHT_HIP)
     
-    def _get_knee_position(self, landmarks: List[Dict]) -> Tuple[float, float]:
+    def _get_knee_position(self, points: np.ndarray) -> Tuple[float, float]:
         """Get knee center position"""
-        left_knee = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.LEFT_KNEE)
-        right_knee = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.RIGHT_KNEE)
-        return ((left_knee[0] + right_knee[0]) / 2, (left_knee[1] + right_knee[1]) / 2)
+        return self._get_center(points, AngleCalculator.LEFT_KNEE, AngleCalculator.RIGHT_KNEE)
     
-    def _get_shoulder_position(self, landmarks: List[Dict]) -> Tuple[float, float]:
+    def _get_shoulder_position(self, points: np.ndarray) -> Tuple[float, float]:
         """Get shoulder center position"""
-        left_shoulder = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.LEFT_SHOULDER)
-        right_shoulder = self.angle_calc.get_landmark_coords(landmarks, AngleCalculator.RIGHT_SHOULDER)
-        return ((left_shoulder[0] + right_shoulder[0]) / 2, (left_shoulder[1] + right_shoulder[1]) / 2)
-    
-    async def annotate_front_squat(self, frame_path: str, landmarks: List[Dict], filename: str) -> str:
-        """Create annotated screenshot for front squat analysis"""
-        try:
-            # Load image
-            image = cv2.imread(frame_path)
-            if image is None:
-                raise Exception("Could not load image")
-            
-            # Create a copy for annotation
-            annotated = image.copy()
-            
-            # Draw pose landmarks
-            self._draw_pose_landmarks(annotated, landmarks)
-            
-            # Analyze and highlight issues
-            issues = self._analyze_front_squat_issues(landmarks)
-            
-            # Draw annotations for each issue
-            for issue in issues:
-                self._draw_annotation(annotated, issue)
-            
-            # Save annotated image
-            output_path = os.path.join(self.temp_dir, f"{filename}.jpg")
-            cv2.imwrite(output_path, annotated)
-            
-            return output_path
-            
-        except Exception as e:
-            print(f"Error annotating front squat: {e}")
-            return frame_path
+        return self._get_center(points, AngleCalculator.LEFT_SHOULDER, AngleCalculator.RIGHT_SHOULDER)
     
-    async def annotate_sumo_deadlift(self, frame_path: str, landmarks: List[Dict], filename: str) -> str:
-        """Create annotated screenshot for sumo deadlift analysis"""
-        try:
-            # Load image
-            image = cv2.imread(frame_path)
-            if image is None:
-                raise Exception("Could not load image")
-            
-            # Create a copy for annotation
-            annotated = image.copy()
-            
-            # Draw pose landmarks
-            self._draw_pose_landmarks(annotated, landmarks)
-            
-            # Analyze and highlight issues
-            issues = self._analyze_sumo_deadlift_issues(landmarks)
-            
-            # Draw annotations for each issue
-            for issue in issues:
-                self._draw_annotation(annotated, issue)
-            
-            # Save annotated image
-            output_path = os.path.join(self.temp_dir, f"{filename}.jpg")
-            cv2.imwrite(output_path, annotated)
-            
-            return output_path
-            
-        except Exception as e:
-            print(f"Error annotating sumo deadlift: {e}")
-            return frame_path
-    
-    def _analyze_front_squat_issues(self, landmarks: List[Dict]) -> List[Dict]:
+    def _analyze_front_squat_issues(self, points: np.ndarray) -> List[Dict]:
         """Analyze front squat specific issues"""
         issues = []
         
         try:
             # Check torso position (should be more upright for front squat)
-            torso_angle = self._calculate_torso_angle(landmarks)
+            torso_angle = self._calculate_torso_angle(points)
             if torso_angle < 80:
                 issues.append({
                     "type": "torso_too_upright",
                     "message": "Torso too upright - allow slight forward lean",
-                    "position": self._get_torso_center(landmarks),
+                    "position": self._get_torso_center(points),
                     "color": (0, 255, 255)  # Yellow
                 })
             elif torso_angle > 100:
                 issues.append({
                     "type": "torso_too_forward",
                     "message": "Torso leaning too far forward",
-                    "position": self._get_torso_center(landmarks),
+                    "position": self._get_torso_center(points),
                     "color": (0, 0, 255)  # Red
                 })
             
             # Check hip depth
-            hip_angle = self._calculate_hip_angle(landmarks)
+            hip_angle = self._calculate_hip_angle(points)
             if hip_angle > 120:
                 issues.append({
                     "type": "insufficient_depth",
                     "message": "Not reaching full depth",
-                    "position": self._get_hip_position(landmarks),
+                    "position": self._get_hip_position(points),
                     "color": (0, 0, 255)  # Red
                 })
             
             # Check knee tracking
-            knee_angle = self._calculate_knee_angle(landmarks)
+            knee_angle = self._calculate_knee_angle(points)
             if knee_angle < 80 or knee_angle > 120:
                 issues.append({
                     "type": "knee_tracking",
                     "message": "Keep knees tracking over toes",
-                    "position": self._get_knee_position(landmarks),
+                    "position": self._get_knee_position(points),
                     "color": (0, 255, 0)  # Green
                 })
                 
@@ -362,52 +372,52 @@ class ScreenshotAnnotator:
         
         return issues
     
-    def _analyze_sumo_deadlift_issues(self, landmarks: List[Dict]) -> List[Dict]:
+    def _analyze_sumo_deadlift_issues(self, points: np.ndarray) -> List[Dict]:
         """Analyze sumo deadlift specific issues"""
         issues = []
         
         try:
             # Check stance width
-            stance_width = self._calculate_stance_width(landmarks)
+            stance_width = self._calculate_stance_width(points)
             if stance_width < 15:
                 issues.append({
                     "type": "stance_too_narrow",
                     "message": "Stance too narrow for sumo deadlift",
-                    "position": self._get_foot_center(landmarks),
+                    "position": self._get_foot_center(points),
                     "color": (0, 255, 255)  # Yellow
                 })
             
             # Check hip position
-            hip_angle = self._calculate_hip_angle(landmarks)
+            hip_angle = self._calculate_hip_angle(points)
             if hip_angle < 70:
                 issues.append({
                     "type": "hips_too_low",
                     "message": "Hips too low - raise them slightly",
-                    "position": self._get_hip_position(landmarks),
+                    "position": self._get_hip_position(points),
                     "color": (0, 255, 0)  # Green
                 })
             elif hip_angle > 110:
                 issues.append({
                     "type": "hips_too_high",
                     "message": "Hips too high - lower them",
-                    "position": self._get_hip_position(landmarks),
+                    "position": self._get_hip_position(points),
                     "color": (0, 0, 255)  # Red
                 })
             
             # Check torso position
-            torso_angle = self._calculate_torso_angle(landmarks)
+            torso_angle = self._calculate_torso_angle(points)
             if torso_angle < 85:
                 issues.append({
                     "type": "torso_too_upright",
                     "message": "Torso too upright",
-                    "position": self._get_torso_center(landmarks),
+                    "position": self._get_torso_center(points),
                     "color": (0, 255, 255)  # Yellow
                 })
             elif torso_angle > 105:
                 issues.append({
                     "type": "torso_too_forward",
                     "message": "Torso leaning too far forward",
-                    "position": self._get_torso_center(landmarks),
+                    "position": self._get_torso_center(points),
                     "color": (0, 0, 255)  # Red
                 })
                 
@@ -416,30 +426,21 @@ class ScreenshotAnnotator:
         
         return issues
     
-    def _calculate_stance_width(self, landmarks: List[Dict]) -> float:
+    def _calculate_stance_width(self, points: np.ndarray) -> float:
         """Calculate stance width for sumo deadlift"""
-        try:
-            left_ankle = landmarks[27]
-            right_ankle = landmarks[28]
-            
-            distance = np.sqrt(
-                (left_ankle['x'] - right_ankle['x'])**2 + 
-                (left_ankle['y'] - right_ankle['y'])**2
-            )
-            
-            return distance * 100
-        except:
-            return 0
+        left_ankle = points[AngleCalculator.LEFT_ANKLE]
+        right_ankle = points[AngleCalculator.RIGHT_ANKLE]
+        
+        distance = math.hypot(
+            left_ankle[0] - right_ankle[0],
+            left_ankle[1] - right_ankle[1]
+        )
+        
+        return distance * 100
     
-    def _get_foot_center(self, landmarks: List[Dict]) -> Tuple[int, int]:
+    def _get_foot_center(self, points: np.ndarray) -> Tuple[float, float]:
         """Get center position between feet"""
-        try:
-            left_ankle = landmarks[27]
-            right_ankle = landmarks[28]
-            
-            center_x = int((left_ankle['x'] + right_ankle['x']) // 2)
-            center_y = int((left_ankle['y'] + right_ankle['y']) // 2)
-            
-            return (center_x, center_y)
-        except:
-            return (320, 400)
+        if np.isnan(points[[AngleCalculator.LEFT_ANKLE, AngleCalculator.RIGHT_ANKLE], 3]).any():
+            return (0.5, 0.6)  # Lower middle of the frame
+        
+        return self._get_center(points, AngleCalculator.LEFT_ANKLE, AngleCalculator.RIGHT_ANKLE)
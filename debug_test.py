@@ -2,12 +2,21 @@
 """
 Detailed QA test to debug the 500 error
 """
+import io
 import requests
 import json
 import time
 
 BACKEND_URL = "https://fix-my-form.onrender.com"
 
+# A minimal but valid MP4 file for testing, kept in memory instead of on disk
+# This is a very basic MP4 structure that should be readable
+TEST_MP4 = bytes([
+    0x00, 0x00, 0x00, 0x20, 0x66, 0x74, 0x79, 0x70, 0x6D, 0x70, 0x34, 0x32,
+    0x00, 0x00, 0x00, 0x00, 0x6D, 0x70, 0x34, 0x31, 0x6D, 0x70, 0x34, 0x32,
+    0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00
+]) + b'\x00' * 1024  # 1KB of zeros to make it look like a real video
+
 def test_detailed_analysis():
     """Test analysis with detailed error reporting"""
     print("🔍 Detailed Analysis Debug Test")
@@ -16,23 +25,9 @@ def test_detailed_analysis():
     # First, let's upload a real video
     print("1. Uploading a test video...")
     
-    # Create a minimal but valid MP4 file for testing
-    # This is a very basic MP4 structure that should be readable
-    mp4_header = bytes([
-        0x00, 0x00, 0x00, 0x20, 0x66, 0x74, 0x79, 0x70, 0x6D, 0x70, 0x34, 0x32,
-        0x00, 0x00, 0x00, 0x00, 0x6D, 0x70, 0x34, 0x31, 0x6D, 0x70, 0x34, 0x32,
-        0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00
-    ])
-    
-    with open("test_video.mp4", "wb") as f:
-        f.write(mp4_header)
-        # Add some dummy data to make it look like a real video
-        f.write(b'\x00' * 1024)  # 1KB of zeros
-    
     try:
-        with open("test_video.mp4", "rb") as f:
-            files = {'file': ('test_video.mp4', f, 'video/mp4')}
-            response = requests.post(f"{BACKEND_URL}/api/upload", files=files, timeout=30)
+        files = {'file': ('test_video.mp4', io.BytesIO(TEST_MP4), 'video/mp4')}
+        response = requests.post(f"{BACKEND_URL}/api/upload", files=files, timeout=30)
         
         if response.status_code == 200:
             upload_data = response.json()
@@ -92,12 +87,6 @@ def test_detailed_analysis():
     except Exception as e:
         print(f"   ❌ Analysis request failed: {e}")
     
-    # Cleanup
-    import os
-    if os.path.exists("test_video.mp4"):
-        os.remove("test_video.mp4")
-        print(f"\n🧹 Cleaned up test file")
-    
     return True
 
 if __name__ == "__main__":
@@ -2,25 +2,39 @@
 """
 End-to-end QA test script for Fix My Form
 """
+import io
 import requests
 import json
 import time
-import os
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
 # Configuration
 BACKEND_URL = "https://fix-my-form.onrender.com"
 FRONTEND_URL = "https://fix-my-form.vercel.app"
 
+# One pooled connection per exercise type analyzed concurrently
+ANALYSIS_WORKERS = 4
+
+# Minimal MP4 header (this won't be a real video, but tests the upload flow)
+TEST_MP4 = b'\x00\x00\x00\x20ftypmp42\x00\x00\x00\x00mp41mp42'
+
 def test_upload_and_analysis():
     """Test the complete upload and analysis flow"""
     print("🧪 Starting End-to-End QA Test")
     print("=" * 50)
     
+    # One session reuses the TCP/TLS connections across every request below
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=ANALYSIS_WORKERS, pool_maxsize=ANALYSIS_WORKERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    
     # Test 1: Backend Health
     print("1. Testing Backend Health...")
     try:
-        response = requests.get(f"{BACKEND_URL}/health", timeout=10)
+        response = session.get(f"{BACKEND_URL}/health", timeout=10)
         if response.status_code == 200:
             print("✅ Backend is healthy")
         else:
@@ -39,24 +53,24 @@ def test_upload_and_analysis():
         videos = list(Path('.').glob(f'**/*.{ext}'))
         test_videos.extend(videos)
     
-    if not test_videos:
+    if test_videos:
+        test_video = test_videos[0]
+        print(f"📹 Using test video: {test_video}")
+    else:
+        # Upload a dummy video straight from memory
         print("⚠️  No test videos found, creating a dummy test...")
-        # Create a minimal test video file
-        test_video_path = "test_video.mp4"
-        with open(test_video_path, 'wb') as f:
-            # Write a minimal MP4 header (this won't be a real video, but tests the upload flow)
-            f.write(b'\x00\x00\x00\x20ftypmp42\x00\x00\x00\x00mp41mp42')
-        
-        test_videos = [Path(test_video_path)]
-    
-    test_video = test_videos[0]
-    print(f"📹 Using test video: {test_video}")
+        test_video = None
+        print("📹 Using test video: test_video.mp4")
     
     # Test upload
     try:
-        with open(test_video, 'rb') as f:
-            files = {'file': (test_video.name, f, 'video/mp4')}
-            response = requests.post(f"{BACKEND_URL}/api/upload", files=files, timeout=30)
+        if test_video is not None:
+            with open(test_video, 'rb') as f:
+                files = {'file': (test_video.name, f, 'video/mp4')}
+                response = session.post(f"{BACKEND_URL}/api/upload", files=files, timeout=30)
+        else:
+            files = {'file': ('test_video.mp4', io.BytesIO(TEST_MP4), 'video/mp4')}
+            response = session.post(f"{BACKEND_URL}/api/upload", files=files, timeout=30)
         
         if response.status_code == 200:
             upload_data = response.json()
@@ -75,66 +89,75 @@ def test_upload_and_analysis():
     print("\n3. Testing Analysis Pipeline...")
     exercise_types = ["back-squat", "front-squat", "conventional-deadlift", "sumo-deadlift"]
     
-    for exercise_type in exercise_types:
-        print(f"\n   Testing {exercise_type}...")
-        
-        try:
+    # Exercise types are analyzed independently, so send every request at once
+    # and report each one as it finishes
+    with ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS) as executor:
+        futures = {}
+        for exercise_type in exercise_types:
             analysis_request = {
                 "file_id": file_id,
                 "filename": filename,
                 "exercise_type": exercise_type
             }
-            
-            print(f"   📤 Sending analysis request...")
-            response = requests.post(
+            future = executor.submit(
+                session.post,
                 f"{BACKEND_URL}/api/analyze",
                 json=analysis_request,
                 timeout=300  # 5 minutes timeout
             )
+            futures[future] = exercise_type
+        print(f"   📤 Sent {len(futures)} analysis requests...")
+        
+        for future in as_completed(futures):
+            exercise_type = futures[future]
+            print(f"\n   Testing {exercise_type}...")
             
-            if response.status_code == 200:
-                analysis_data = response.json()
-                print(f"   ✅ {exercise_type} analysis completed")
-                print(f"   📊 Status: {analysis_data.get('status', 'unknown')}")
+            try:
+                response = future.result()
                 
-                if 'feedback' in analysis_data:
-                    feedback = analysis_data['feedback']
-                    overall_score = feedback.get('overall_score', 'N/A')
-                    print(f"   🎯 Overall Score: {overall_score}")
+                if response.status_code == 200:
+                    analysis_data = response.json()
+                    print(f"   ✅ {exercise_type} analysis completed")
+                    print(f"   📊 Status: {analysis_data.get('status', 'unknown')}")
                     
-                    if 'exercise_breakdown' in feedback:
-                        breakdown = feedback['exercise_breakdown']
-                        print(f"   📋 Breakdown scores:")
-                        for key, value in breakdown.items():
-                            if isinstance(value, dict):
-                                score = value.get('score', 'N/A')
-                                print(f"      - {key}: {score}")
-                
-                # Check for metrics
-                if 'metrics' in analysis_data:
-                    metrics = analysis_data['metrics']
-                    if 'movement_analysis' in metrics:
-                        movement = metrics['movement_analysis']
-                        print(f"   🏃 Movement Analysis:")
-                        print(f"      - Total frames: {movement.get('total_frames', 'N/A')}")
-                        print(f"      - Movement frames: {movement.get('movement_frames', 'N/A')}")
-                        print(f"      - Movement period: {movement.get('movement_period', 'N/A')}")
-                
-            elif response.status_code == 504:
+                    if 'feedback' in analysis_data:
+                        feedback = analysis_data['feedback']
+                        overall_score = feedback.get('overall_score', 'N/A')
+                        print(f"   🎯 Overall Score: {overall_score}")
+                        
+                        if 'exercise_breakdown' in feedback:
+                            breakdown = feedback['exercise_breakdown']
+                            print(f"   📋 Breakdown scores:")
+                            for key, value in breakdown.items():
+                                if isinstance(value, dict):
+                                    score = value.get('score', 'N/A')
+                                    print(f"      - {key}: {score}")
+                    
+                    # Check for metrics
+                    if 'metrics' in analysis_data:
+                        metrics = analysis_data['metrics']
+                        if 'movement_analysis' in metrics:
+                            movement = metrics['movement_analysis']
+                            print(f"   🏃 Movement Analysis:")
+                            print(f"      - Total frames: {movement.get('total_frames', 'N/A')}")
+                            print(f"      - Movement frames: {movement.get('movement_frames', 'N/A')}")
+                            print(f"      - Movement period: {movement.get('movement_period', 'N/A')}")
+                    
+                elif response.status_code == 504:
+                    print(f"   ⏰ {exercise_type} analysis timed out")
+                else:
+                    print(f"   ❌ {exercise_type} analysis failed: {response.status_code}")
+                    print(f"   📝 Error: {response.text}")
+                    
+            except requests.exceptions.Timeout:
                 print(f"   ⏰ {exercise_type} analysis timed out")
-            else:
-                print(f"   ❌ {exercise_type} analysis failed: {response.status_code}")
-                print(f"   📝 Error: {response.text}")
-                
-        except requests.exceptions.Timeout:
-            print(f"   ⏰ {exercise_type} analysis timed out")
-        except Exception as e:
-            print(f"   ❌ {exercise_type} analysis failed: {e}")
+            except Exception as e:
+                print(f"   ❌ {exercise_type} analysis failed: {e}")
     
     # Test 4: Check analysis results endpoint
     print(f"\n4. Testing Analysis Results Retrieval...")
     try:
-        response = requests.get(f"{BACKEND_URL}/api/analysis/{file_id}", timeout=10)
+        response = session.get(f"{BACKEND_URL}/api/analysis/{file_id}", timeout=10)
         if response.status_code == 200:
             print("✅ Analysis results can be retrieved")
         else:
@@ -142,11 +165,6 @@ def test_upload_and_analysis():
     except Exception as e:
         print(f"❌ Analysis results retrieval failed: {e}")
     
-    # Cleanup
-    if test_video.name == "test_video.mp4" and os.path.exists(test_video):
-        os.remove(test_video)
-        print(f"\n🧹 Cleaned up test file: {test_video}")
-    
     print("\n" + "=" * 50)
     print("🎉 End-to-End QA Test Completed!")
     return True
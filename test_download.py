@@ -2,9 +2,13 @@
 """
 Test if the issue is with video download from R2
 """
+import io
 import requests
 import json
 
+# Minimal video file, kept in memory instead of written to disk
+TEST_MP4 = b'\x00\x00\x00\x20ftypmp42\x00\x00\x00\x00mp41mp42' + b'\x00' * 1024
+
 def test_video_download():
     """Test if we can download a video from R2"""
     print("🔍 Testing Video Download from R2")
@@ -15,15 +19,9 @@ def test_video_download():
     # First, upload a video
     print("1. Uploading test video...")
     
-    # Create a minimal video file
-    with open('test_video.mp4', 'wb') as f:
-        f.write(b'\x00\x00\x00\x20ftypmp42\x00\x00\x00\x00mp41mp42')
-        f.write(b'\x00' * 1024)
-    
     try:
-        with open('test_video.mp4', 'rb') as f:
-            files = {'file': ('test_video.mp4', f, 'video/mp4')}
-            response = requests.post(f"{BACKEND_URL}/api/upload", files=files, timeout=30)
+        files = {'file': ('test_video.mp4', io.BytesIO(TEST_MP4), 'video/mp4')}
+        response = requests.post(f"{BACKEND_URL}/api/upload", files=files, timeout=30)
         
         if response.status_code == 200:
             upload_data = response.json()
@@ -76,13 +74,6 @@ def test_video_download():
     except Exception as e:
         print(f"❌ Test failed: {e}")
         return False
-    
-    finally:
-        # Cleanup
-        import os
-        if os.path.exists('test_video.mp4'):
-            os.remove('test_video.mp4')
-            print(f"\n🧹 Cleaned up test file")
 
 if __name__ == "__main__":
     test_video_download()
@@ -1,5 +1,14 @@
 import os
-import google.generativeai as genai
+import json
+import time
+import hashlib
+
+MODEL = 'gemini-2.0-flash-exp'
+PROMPT = "Say 'Hello, Gemini!'"
+
+# Responses from earlier runs, so re-running the check doesn't spend another API call
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fix-my-form", "gemini")
+CACHE_TTL = 60 * 60  # Seconds; after this the API is checked again, catching revoked keys or retired models
 
 # Test if API key is available
 api_key = os.getenv("GOOGLE_AI_API_KEY")
@@ -8,13 +17,27 @@ print(f"API Key starts with: {api_key[:10] if api_key else 'None'}...")
 
 if api_key:
     try:
+        # Imported here so the no-key path skips the slow SDK import
+        import google.generativeai as genai
+        
         genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        model = genai.GenerativeModel(MODEL)
         print("✅ Gemini model initialized successfully")
         
-        # Test with a simple text prompt
-        response = model.generate_content("Say 'Hello, Gemini!'")
-        print(f"✅ Test response: {response.text}")
+        # Test with a simple text prompt; the key is part of the cache key so a new key
+        # is always checked against the API (set FORCE_REFRESH to skip the cache)
+        cache_key = hashlib.sha256(f"{api_key}|{MODEL}|{PROMPT}".encode()).hexdigest()
+        cache_path = os.path.join(CACHE_DIR, f"{cache_key}.json")
+        cache_fresh = os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < CACHE_TTL
+        if cache_fresh and not os.getenv("FORCE_REFRESH"):
+            with open(cache_path) as f:
+                print(f"✅ Test response (cached): {json.load(f)['text']}")
+        else:
+            response = model.generate_content(PROMPT)
+            print(f"✅ Test response: {response.text}")
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump({"text": response.text}, f)
         
     except Exception as e:
         print(f"❌ Error: {e}")